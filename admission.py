@@ -0,0 +1,273 @@
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import current_app, g, jsonify, request, session, Response
+
+# ─── LIMITS ───────────────────────────────────────────────────
+# Token buckets keyed by rule and client: a logged-in user is one client
+# wherever they connect from, anyone else is their IP. Each rule is
+# (tokens per second, burst). Only the listed method counts, so viewing the
+# booking form is free and submitting it is not. RATE_LIMITS in the config
+# replaces entries here; a value of None switches a rule off.
+DEFAULT_LIMITS = {
+    'GET main.api_slots': (5, 30),
+    'POST main.book': (0.2, 10),
+    'POST main.confirm_booking': (0.2, 10),
+    'POST main.api_bulk_booking': (0.05, 3),
+}
+
+# Routes whose work is mostly SQLite. At most CONCURRENCY of them run at
+# once in a worker; up to QUEUE more wait at most QUEUE_TIMEOUT seconds for
+# a turn and everything past that is shed straight away with a 503. The
+# server never runs more requests at once than its threads, so a gate as
+# wide as the pool would never engage: by default the gate is one narrower
+# than SERVER_THREADS, which keeps a thread free for pages that skip it.
+GATED = {'main.api_slots', 'main.book', 'main.confirm_booking', 'main.api_bulk_booking',
+         'main.find_turfs', 'main.dashboard', 'main.cancel_booking'}
+CONCURRENCY = 3           # used when SERVER_THREADS is not known
+QUEUE = 32
+QUEUE_TIMEOUT = 1.0
+SHED_RETRY_AFTER = 1      # seconds suggested to shed clients
+
+
+# ─── BACKENDS ─────────────────────────────────────────────────
+
+class BucketBackend:
+    """Where token buckets live. A shared backend makes a limit hold across workers."""
+
+    def take(self, key, rate, burst):
+        """Spend one token. Returns (allowed, seconds until a token is available)."""
+        raise NotImplementedError
+
+    def size(self):
+        """Buckets held, or None if the backend cannot tell cheaply."""
+        return None
+
+
+class LocalBuckets(BucketBackend):
+    """In-process buckets, so each worker enforces its own share of a limit.
+
+    The least recently used bucket is dropped past max_entries; a client
+    that comes back simply starts with a full bucket.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def size(self):
+        return len(self._buckets)
+
+
+class RedisBuckets(BucketBackend):
+    """Buckets shared by every worker and host. Needs the optional `redis` package.
+
+    The refill and spend run as one script on the server's clock, so
+    concurrent workers cannot both spend the last token.
+    """
+
+    SCRIPT = '''
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = math.min(burst, (tonumber(state[1]) or burst) + (now - (tonumber(state[2]) or now)) * rate)
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return {allowed, tostring(tokens)}
+    '''
+
+    def __init__(self, url, prefix='turfbook:ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATELIMIT_URL is set but the redis package is not installed.')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[rate, burst])
+        allowed = bool(int(allowed))
+        return allowed, 0.0 if allowed else (1 - float(tokens)) / rate
+
+
+# ─── CONCURRENCY GATE ─────────────────────────────────────────
+
+class ConcurrencyGate:
+    """Bounded slots with a short, bounded wait queue.
+
+    enter() returns 'admitted' or 'queued' once the caller holds a slot, in
+    which case it must call leave(); 'shed' when the queue is full and
+    'timeout' when no slot freed up in time, in which case it must not.
+    Per process: it protects this worker's connections and threads.
+    """
+
+    def __init__(self, limit=CONCURRENCY, queue=QUEUE, timeout=QUEUE_TIMEOUT):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def enter(self):
+        with self._cond:
+            if self.active < self.limit and not self.waiting:
+                self.active += 1
+                return 'admitted'
+            if self.waiting >= self.queue:
+                return 'shed'
+            self.waiting += 1
+            try:
+                ok = self._cond.wait_for(lambda: self.active < self.limit, self.timeout)
+            finally:
+                self.waiting -= 1
+            if not ok:
+                return 'timeout'
+            self.active += 1
+            return 'queued'
+
+    def leave(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+# ─── METRICS ──────────────────────────────────────────────────
+
+class AdmissionMetrics:
+    """Per-endpoint counts of admitted, queued and rejected requests."""
+
+    OUTCOMES = ('admitted', 'queued', 'rate_limited', 'shed', 'timeout')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: dict.fromkeys(self.OUTCOMES, 0))
+        self._waited = defaultdict(float)
+        self._max_wait = defaultdict(float)
+
+    def add(self, endpoint, outcome, waited=0.0):
+        with self._lock:
+            self._counts[endpoint][outcome] += 1
+            if waited:
+                self._waited[endpoint] += waited
+                self._max_wait[endpoint] = max(self._max_wait[endpoint], waited)
+
+    def summary(self):
+        with self._lock:
+            out = {}
+            for endpoint, counts in sorted(self._counts.items()):
+                row = dict(counts)
+                row['rejected'] = counts['rate_limited'] + counts['shed'] + counts['timeout']
+                waits = counts['queued'] + counts['timeout']
+                row['avg_wait_ms'] = round(self._waited[endpoint] / waits * 1000, 2) if waits else 0.0
+                row['max_wait_ms'] = round(self._max_wait[endpoint] * 1000, 2)
+                out[endpoint] = row
+            return out
+
+
+# ─── ADMISSION ────────────────────────────────────────────────
+
+class Admission:
+    """before_request/teardown_request hooks applying the limits and the gate.
+
+    Rate limits are checked first, so a client over its budget never takes
+    a slot. Rejections are 429 (this client, Retry-After until its next
+    token) or 503 (the worker is busy), JSON under /api/ and plain text
+    elsewhere.
+    """
+
+    def __init__(self, backend, limits, gate, gated=GATED):
+        self.backend = backend
+        self.limits = {rule: limit for rule, limit in limits.items() if limit}
+        self.gate = gate
+        self.gated = set(gated)
+        self.metrics = AdmissionMetrics()
+
+    def client(self):
+        user_id = session.get('user_id')
+        return f'u{user_id}' if user_id is not None else f'ip{request.remote_addr}'
+
+    def before_request(self):
+        endpoint = request.endpoint
+        limit = self.limits.get(f'{request.method} {endpoint}')
+        if limit is not None:
+            allowed, retry_after = self.backend.take(f'{request.method} {endpoint}:{self.client()}', *limit)
+            if not allowed:
+                self.metrics.add(endpoint, 'rate_limited')
+                return self.reject(429, 'Too many requests; slow down and try again shortly.', retry_after)
+        if self.gate is not None and endpoint in self.gated:
+            started = time.perf_counter()
+            outcome = self.gate.enter()
+            self.metrics.add(endpoint, outcome, time.perf_counter() - started if outcome != 'admitted' else 0.0)
+            if outcome in ('shed', 'timeout'):
+                return self.reject(503, 'The server is busy; please try again in a moment.', SHED_RETRY_AFTER)
+            g.admission_slot = True
+        elif limit is not None:
+            self.metrics.add(endpoint, 'admitted')
+
+    def teardown_request(self, exc=None):
+        if g.pop('admission_slot', False):
+            self.gate.leave()
+
+    def reject(self, status, message, retry_after):
+        headers = {'Retry-After': str(max(1, math.ceil(retry_after)))}
+        if request.path.startswith('/api/'):
+            return jsonify({'error': message}), status, headers
+        return Response(message, status, headers, mimetype='text/plain')
+
+    def stats(self):
+        return {
+            'endpoints': self.metrics.summary(),
+            'in_flight': self.gate.active if self.gate else 0,
+            'waiting': self.gate.waiting if self.gate else 0,
+            'concurrency': self.gate.limit if self.gate else None,
+            'buckets': self.backend.size(),
+        }
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    if app.config.get('RATELIMIT_URL'):
+        backend = RedisBuckets(app.config['RATELIMIT_URL'])
+    else:
+        backend = LocalBuckets(app.config.get('RATELIMIT_MAX_CLIENTS', 100000))
+    limits = dict(DEFAULT_LIMITS, **app.config.get('RATE_LIMITS', {}))
+    if not app.config.get('RATELIMIT_ENABLED', True):
+        limits = {}
+    # 0 turns the gate off
+    threads = app.config.get('SERVER_THREADS')
+    concurrency = app.config.get('ADMISSION_CONCURRENCY', max(1, threads - 1) if threads else CONCURRENCY)
+    gate = ConcurrencyGate(concurrency, app.config.get('ADMISSION_QUEUE', threads or QUEUE),
+                           app.config.get('ADMISSION_QUEUE_TIMEOUT', QUEUE_TIMEOUT)) if concurrency else None
+    admission = Admission(backend, limits, gate, app.config.get('ADMISSION_GATED', GATED))
+    app.extensions['admission'] = admission
+    app.before_request(admission.before_request)
+    app.teardown_request(admission.teardown_request)
+
+
+def get_admission():
+    return current_app.extensions['admission']
@@ -0,0 +1,165 @@
+from datetime import date, timedelta
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# Running totals for the admin and user dashboards, maintained by triggers on
+# every write path (booking, cancel, register, add turf). There are deliberately no
+# DELETE triggers on bookings: archiving old rows must not change history.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_turf_stats (
+        day TEXT NOT NULL,
+        turf_id INTEGER NOT NULL,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        confirmed INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        hours REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, turf_id)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS agg_users_ai AFTER INSERT ON users WHEN new.role='user' BEGIN
+        UPDATE stats_counters SET value=value+1 WHERE name='total_users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS agg_users_role AFTER UPDATE OF role ON users
+    WHEN (old.role='user') != (new.role='user') BEGIN
+        UPDATE stats_counters SET value=value + (CASE WHEN new.role='user' THEN 1 ELSE -1 END)
+        WHERE name='total_users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS agg_turfs_ai AFTER INSERT ON turfs BEGIN
+        UPDATE stats_counters SET value=value+1 WHERE name='total_turfs';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS agg_bookings_ai AFTER INSERT ON bookings BEGIN
+        UPDATE stats_counters SET value=value+1 WHERE name='total_bookings';
+        UPDATE stats_counters SET value=value+new.total_amount
+        WHERE name='total_revenue' AND new.status='confirmed';
+        INSERT INTO daily_turf_stats (day, turf_id, bookings, confirmed, revenue, hours)
+        VALUES (new.booking_date, new.turf_id, 1,
+                new.status='confirmed',
+                CASE WHEN new.status='confirmed' THEN new.total_amount ELSE 0 END,
+                CASE WHEN new.status='confirmed' THEN new.duration_hours ELSE 0 END)
+        ON CONFLICT(day, turf_id) DO UPDATE SET
+            bookings=bookings+1,
+            confirmed=confirmed+excluded.confirmed,
+            revenue=revenue+excluded.revenue,
+            hours=hours+excluded.hours;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS agg_bookings_status AFTER UPDATE OF status ON bookings
+    WHEN (old.status='confirmed') != (new.status='confirmed') BEGIN
+        UPDATE stats_counters
+        SET value=value + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END) * new.total_amount
+        WHERE name='total_revenue';
+        UPDATE daily_turf_stats SET
+            confirmed=confirmed + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END),
+            revenue=revenue + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END) * new.total_amount,
+            hours=hours + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END) * new.duration_hours
+        WHERE day=new.booking_date AND turf_id=new.turf_id;
+    END;
+'''
+
+# Per-user booking count and confirmed spend for the user dashboard. Kept
+# apart from SCHEMA so databases that already have the admin aggregates
+# get this table backfilled on its own.
+USER_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS user_booking_stats (
+        user_id INTEGER PRIMARY KEY,
+        bookings INTEGER NOT NULL DEFAULT 0,
+        confirmed INTEGER NOT NULL DEFAULT 0,
+        spent INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TRIGGER IF NOT EXISTS agg_user_bookings_ai AFTER INSERT ON bookings BEGIN
+        INSERT INTO user_booking_stats (user_id, bookings, confirmed, spent)
+        VALUES (new.user_id, 1, new.status='confirmed',
+                CASE WHEN new.status='confirmed' THEN new.total_amount ELSE 0 END)
+        ON CONFLICT(user_id) DO UPDATE SET
+            bookings=bookings+1,
+            confirmed=confirmed+excluded.confirmed,
+            spent=spent+excluded.spent;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS agg_user_bookings_status AFTER UPDATE OF status ON bookings
+    WHEN (old.status='confirmed') != (new.status='confirmed') BEGIN
+        UPDATE user_booking_stats SET
+            confirmed=confirmed + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END),
+            spent=spent + (CASE WHEN new.status='confirmed' THEN 1 ELSE -1 END) * new.total_amount
+        WHERE user_id=new.user_id;
+    END;
+'''
+
+COUNTERS = {
+    'total_turfs': "SELECT COUNT(*) FROM turfs",
+    'total_users': "SELECT COUNT(*) FROM users WHERE role='user'",
+    'total_bookings': "SELECT COUNT(*) FROM all_bookings",
+    'total_revenue': "SELECT COALESCE(SUM(total_amount), 0) FROM all_bookings WHERE status='confirmed'",
+}
+
+
+def init_schema(conn):
+    fresh = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='stats_counters'").fetchone()
+    fresh_users = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='user_booking_stats'").fetchone()
+    conn.executescript(SCHEMA)
+    conn.executescript(USER_SCHEMA)
+    if fresh:
+        rebuild(conn)
+    elif fresh_users:
+        rebuild_users(conn)
+
+
+def rebuild(conn):
+    """Recompute every aggregate from the base tables (backfill / repair)."""
+    for name, sql in COUNTERS.items():
+        conn.execute("INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, (%s))" % sql, (name,))
+    conn.execute("DELETE FROM daily_turf_stats")
+    conn.execute("""
+        INSERT INTO daily_turf_stats (day, turf_id, bookings, confirmed, revenue, hours)
+        SELECT booking_date, turf_id, COUNT(*),
+               SUM(status='confirmed'),
+               SUM(CASE WHEN status='confirmed' THEN total_amount ELSE 0 END),
+               SUM(CASE WHEN status='confirmed' THEN duration_hours ELSE 0 END)
+        FROM all_bookings GROUP BY booking_date, turf_id
+    """)
+    rebuild_users(conn)
+
+
+def rebuild_users(conn):
+    conn.execute("DELETE FROM user_booking_stats")
+    conn.execute("""
+        INSERT INTO user_booking_stats (user_id, bookings, confirmed, spent)
+        SELECT user_id, COUNT(*), SUM(status='confirmed'),
+               SUM(CASE WHEN status='confirmed' THEN total_amount ELSE 0 END)
+        FROM all_bookings GROUP BY user_id
+    """)
+
+
+def counters(conn):
+    return {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM stats_counters")}
+
+
+def revenue_by_day(conn, days=30):
+    """[(day, revenue, bookings)] for the last `days` days up to today, zero-filled."""
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    totals = {row['day']: (row['revenue'], row['bookings']) for row in conn.execute("""
+        SELECT day, SUM(revenue) AS revenue, SUM(confirmed) AS bookings FROM daily_turf_stats
+        WHERE day BETWEEN ? AND ? GROUP BY day
+    """, (start.isoformat(), end.isoformat()))}
+    return [(d, *totals.get(d, (0, 0)))
+            for d in ((start + timedelta(days=i)).isoformat() for i in range(days))]
+
+
+def turf_utilization(conn, days=30):
+    """Booked hours and revenue per turf over the last `days` days, busiest first."""
+    start = (date.today() - timedelta(days=days - 1)).isoformat()
+    return conn.execute("""
+        SELECT t.id, t.name, COALESCE(SUM(s.hours), 0) AS hours, COALESCE(SUM(s.revenue), 0) AS revenue
+        FROM turfs t LEFT JOIN daily_turf_stats s ON s.turf_id=t.id AND s.day BETWEEN ? AND ?
+        WHERE t.is_active=1
+        GROUP BY t.id ORDER BY hours DESC, t.id
+    """, (start, date.today().isoformat())).fetchall()
@@ -1,30 +1,76 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, session, jsonify, flash, Response, stream_with_context
+from markupsafe import Markup
 import sqlite3
+import click
 import hashlib
+import json
 import os
 from datetime import datetime, date, timedelta
 from functools import wraps
 
-app = Flask(__name__)
-app.secret_key = 'turfbook_secret_key_2024'
-DB_PATH = os.path.join(os.path.dirname(__file__), 'turfbook.db')
+import db
+import availability
+import search
+import geo
+import pagination
+import export
+import aggregates
+import reviews
+import cache
+import perf
+import passwords
+import booking
+import jobs
+import pricing
+import slots
+import sessions
+import assets
+import compress
+import archive
+import admission
+from db import get_db
+from booking import (BookingError, SlotConflict, place_hold, release_hold, create_booking, create_bulk_bookings,
+                     expand_recurrence, parse_time, normalize_time, duration_hours, MAX_OCCURRENCES)
 
-# Error handler for database errors
-class BookingError(Exception):
-    pass
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'turfbook.db')
 
-# ─── DB HELPERS ───────────────────────────────────────────────
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Every route and CLI command lives on this blueprint; create_app() builds the app
+bp = Blueprint('main', __name__, cli_group=None)
 
-def hash_password(pw):
-    return hashlib.sha256(pw.encode()).hexdigest()
+
+def database_path():
+    return os.environ.get('TURFBOOK_DB', DEFAULT_DB_PATH)
+
+
+def create_app(config=None):
+    """Build a configured app. Creating one never touches the schema: run
+    init_db() once before starting workers (serve.py does this)."""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('TURFBOOK_SECRET_KEY', 'turfbook_secret_key_2024')
+    app.config['DATABASE'] = database_path()
+    app.config['PERF_ENABLED'] = os.environ.get('TURFBOOK_PERF') == '1'
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('TURFBOOK_RATELIMIT', '1') == '1'
+    if os.environ.get('TURFBOOK_THREADS'):
+        app.config['SERVER_THREADS'] = int(os.environ['TURFBOOK_THREADS'])
+    app.config.update(config or {})
+    db.init_app(app)
+    compress.init_app(app)
+    assets.init_app(app)
+    sessions.init_app(app)
+    perf.init_app(app)
+    admission.init_app(app)
+    availability.init_app(app)
+    cache.init_app(app)
+    slots.init_app(app)
+    pricing.init_app(app)
+    passwords.init_app(app)
+    jobs.init_app(app)
+    app.register_blueprint(bp)
+    return app
 
 # ─── INIT DB ─────────────────────────────────────────────────
-def init_db():
-    conn = get_db()
+def init_db(path=None):
+    conn = db.connect(path or database_path())
     c = conn.cursor()
     c.executescript('''
         CREATE TABLE IF NOT EXISTS users (
@@ -84,39 +130,75 @@ def init_db():
             FOREIGN KEY(user_id) REFERENCES users(id),
             FOREIGN KEY(turf_id) REFERENCES turfs(id)
         );
+
+        CREATE INDEX IF NOT EXISTS idx_bookings_slot
+            ON bookings(turf_id, booking_date, status, start_time, end_time);
+        CREATE INDEX IF NOT EXISTS idx_bookings_date_id ON bookings(booking_date, id);
+        CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON bookings(user_id, booking_date, id, status);
     ''')
+    db.add_column(conn, 'turfs', 'lat', 'REAL')
+    db.add_column(conn, 'turfs', 'lon', 'REAL')
+    archive.init_schema(conn)
+    search.init_schema(conn)
+    geo.init_schema(conn)
+    aggregates.init_schema(conn)
+    reviews.init_schema(conn)
+    booking.init_schema(conn)
+    jobs.init_schema(conn)
+    pricing.init_schema(conn)
+    sessions.init_schema(conn)
 
     # Seed turfs if empty
+    turfs = [
+        ("Green Arena Football Turf", "Koramangala", "Bangalore", 1.2, 4.8, 245, "6 AM", "11 PM", 22, 1200, "Football,Cricket", "Parking,Floodlight,Cafeteria", "🏟️", "Premium football turf with top-quality artificial grass and floodlights.", 12.9352, 77.6245),
+        ("Premier Cricket Academy", "Indiranagar", "Bangalore", 2.5, 4.6, 189, "5 AM", "10 PM", 22, 1500, "Cricket", "Nets,Coaching,Parking", "🏏", "Professional cricket academy with practice nets and expert coaching.", 12.9784, 77.6408),
+        ("Smash Badminton Hub", "HSR Layout", "Bangalore", 0.8, 4.9, 312, "6 AM", "11 PM", 8, 800, "Badminton", "AC,Locker,Trainer", "🏸", "Air-conditioned badminton courts with professional trainers.", 12.9116, 77.6474),
+        ("Elite Tennis Academy", "Whitefield", "Bangalore", 5.1, 4.7, 156, "5 AM", "9 PM", 4, 1000, "Tennis", "Clay Court,Hard Court,Coaching", "🎾", "Premium tennis academy with clay and hard courts.", 12.9698, 77.75),
+        ("City Sports Complex", "Marathahalli", "Bangalore", 4.6, 4.5, 423, "6 AM", "12 AM", 22, 1100, "Football,Cricket,Basketball", "Parking,Canteen,Showers", "🏙️", "Multi-sport complex with facilities for football, cricket and basketball.", 12.9591, 77.6974),
+        ("Hoops Arena", "Yelahanka", "Bangalore", 6.3, 4.6, 198, "6 AM", "10 PM", 10, 900, "Basketball", "Indoor Court,Scoreboard", "🏀", "Professional indoor basketball court with electronic scoreboard.", 13.1007, 77.5963),
+        ("Vaishali Cricket Ground", "Vaishali", "Delhi", 2.0, 4.4, 134, "6 AM", "10 PM", 22, 1000, "Cricket", "Parking,Nets", "🏏", "Well-maintained cricket ground with practice nets.", 28.6448, 77.339),
+        ("Vaishali Football Arena", "Vaishali", "Delhi", 1.5, 4.3, 98, "7 AM", "9 PM", 22, 900, "Football", "Floodlight,Parking", "⚽", "Quality football turf with floodlights for evening games.", 28.6481, 77.3422),
+    ]
     c.execute("SELECT COUNT(*) FROM turfs")
     if c.fetchone()[0] == 0:
-        turfs = [
-            ("Green Arena Football Turf", "Koramangala", "Bangalore", 1.2, 4.8, 245, "6 AM", "11 PM", 22, 1200, "Football,Cricket", "Parking,Floodlight,Cafeteria", "🏟️", "Premium football turf with top-quality artificial grass and floodlights."),
-            ("Premier Cricket Academy", "Indiranagar", "Bangalore", 2.5, 4.6, 189, "5 AM", "10 PM", 22, 1500, "Cricket", "Nets,Coaching,Parking", "🏏", "Professional cricket academy with practice nets and expert coaching."),
-            ("Smash Badminton Hub", "HSR Layout", "Bangalore", 0.8, 4.9, 312, "6 AM", "11 PM", 8, 800, "Badminton", "AC,Locker,Trainer", "🏸", "Air-conditioned badminton courts with professional trainers."),
-            ("Elite Tennis Academy", "Whitefield", "Bangalore", 5.1, 4.7, 156, "5 AM", "9 PM", 4, 1000, "Tennis", "Clay Court,Hard Court,Coaching", "🎾", "Premium tennis academy with clay and hard courts."),
-            ("City Sports Complex", "Marathahalli", "Bangalore", 4.6, 4.5, 423, "6 AM", "12 AM", 22, 1100, "Football,Cricket,Basketball", "Parking,Canteen,Showers", "🏙️", "Multi-sport complex with facilities for football, cricket and basketball."),
-            ("Hoops Arena", "Yelahanka", "Bangalore", 6.3, 4.6, 198, "6 AM", "10 PM", 10, 900, "Basketball", "Indoor Court,Scoreboard", "🏀", "Professional indoor basketball court with electronic scoreboard."),
-            ("Vaishali Cricket Ground", "Vaishali", "Delhi", 2.0, 4.4, 134, "6 AM", "10 PM", 22, 1000, "Cricket", "Parking,Nets", "🏏", "Well-maintained cricket ground with practice nets."),
-            ("Vaishali Football Arena", "Vaishali", "Delhi", 1.5, 4.3, 98, "7 AM", "9 PM", 22, 900, "Football", "Floodlight,Parking", "⚽", "Quality football turf with floodlights for evening games."),
-        ]
-        c.executemany("INSERT INTO turfs (name,location,city,distance,rating,review_count,open_time,close_time,max_players,price_per_hour,sports,amenities,image_url,description) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", turfs)
+        c.executemany("INSERT INTO turfs (name,location,city,distance,rating,review_count,open_time,close_time,max_players,price_per_hour,sports,amenities,image_url,description,lat,lon) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", turfs)
+    else:
+        # Databases created before turfs had coordinates
+        c.executemany("UPDATE turfs SET lat=?, lon=? WHERE name=? AND lat IS NULL", [(t[-2], t[-1], t[0]) for t in turfs])
 
     # Seed admin user
     c.execute("SELECT COUNT(*) FROM users WHERE role='admin'")
     if c.fetchone()[0] == 0:
         c.execute("INSERT INTO users (name,email,phone,password,role) VALUES (?,?,?,?,?)",
-                  ('Admin', 'admin@turfbook.com', '9876543210', hash_password('admin123'), 'admin'))
+                  ('Admin', 'admin@turfbook.com', '9876543210', passwords.hash_password('admin123'), 'admin'))
 
     conn.commit()
     conn.close()
 
+# ─── CATALOG READS ────────────────────────────────────────────
+# Turf data changes only in admin_add_turf, admin_delete_turf and add_review;
+# those bump the catalog generation, so these reads can be cached freely.
+def get_turf(turf_id):
+    def load():
+        row = get_db().execute("SELECT * FROM turfs WHERE id=?", (turf_id,)).fetchone()
+        return dict(row) if row else None
+    return cache.get_catalog().get_or_load(f'turf:{turf_id}', load)
+
+def featured_turfs():
+    return cache.get_catalog().get_or_load('featured', lambda: [
+        dict(r) for r in get_db().execute("SELECT * FROM turfs WHERE is_active=1 ORDER BY rating DESC LIMIT 6")])
+
+def quote_booking(turf_id, booking_date, start_time, end_time):
+    """Price of a slot from the turf's compiled price grid (see pricing.py)."""
+    return pricing.quote(pricing.get_grids().get(turf_id, get_db), booking_date, start_time, end_time)
+
 # ─── AUTH DECORATORS ──────────────────────────────────────────
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         if 'user_id' not in session:
             flash('Please login to continue.', 'warning')
-            return redirect(url_for('login'))
+            return redirect(url_for('.login'))
         return f(*args, **kwargs)
     return decorated
 
@@ -125,80 +207,93 @@ def admin_required(f):
     def decorated(*args, **kwargs):
         if session.get('role') != 'admin':
             flash('Admin access required.', 'danger')
-            return redirect(url_for('index'))
+            return redirect(url_for('.index'))
         return f(*args, **kwargs)
     return decorated
 
+# ─── CONDITIONAL GET ──────────────────────────────────────────
+def conditional_page(f):
+    """Answer If-None-Match with a bodiless 304 for pages that rarely change.
+
+    The weak ETag is a digest of the rendered body, so it is the same on
+    every worker for the same page and changes whenever the content does
+    (catalog edits, deploys, who is signed in, flashed messages). Rendering
+    still happens; what a match saves is sending the page.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        response = current_app.make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:20]
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return decorated
+
 # ─── ROUTES ───────────────────────────────────────────────────
 
-@app.route('/')
+@bp.route('/')
+@conditional_page
 def index():
-    conn = get_db()
-    featured = conn.execute("SELECT * FROM turfs WHERE is_active=1 ORDER BY rating DESC LIMIT 6").fetchall()
-    conn.close()
-    return render_template('index.html', turfs=featured)
+    # The card grid has no per-user content, so it is cached rendered
+    cards = cache.get_catalog().get_or_load(
+        'fragment:featured_cards', lambda: render_template('partials/turf_cards.html', turfs=featured_turfs()))
+    return render_template('index.html', turf_cards=Markup(cards))
 
-@app.route('/find-turfs')
+@bp.route('/find-turfs')
 def find_turfs():
     location = request.args.get('location', '')
     sport = request.args.get('sport', '')
+    q = request.args.get('q', '')
     min_price = request.args.get('min_price', 0, type=int)
     max_price = request.args.get('max_price', 9999, type=int)
     sort = request.args.get('sort', 'rating')
+    page = max(request.args.get('page', 1, type=int), 1)
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = min(request.args.get('radius', 10, type=float), geo.MAX_RADIUS_KM)
+    near = (lat, lon, radius) if lat is not None and lon is not None else None
 
-    conn = get_db()
-    query = "SELECT * FROM turfs WHERE is_active=1"
-    params = []
-    if location:
-        query += " AND (location LIKE ? OR city LIKE ?)"
-        params += [f'%{location}%', f'%{location}%']
-    if sport:
-        query += " AND sports LIKE ?"
-        params.append(f'%{sport}%')
-    if min_price:
-        query += " AND price_per_hour >= ?"
-        params.append(min_price)
-    if max_price < 9999:
-        query += " AND price_per_hour <= ?"
-        params.append(max_price)
-
-    sort_map = {'rating': 'rating DESC', 'price_asc': 'price_per_hour ASC', 'price_desc': 'price_per_hour DESC', 'distance': 'distance ASC'}
-    query += f" ORDER BY {sort_map.get(sort, 'rating DESC')}"
-
-    turfs = conn.execute(query, params).fetchall()
-    conn.close()
-    return render_template('find_turfs.html', turfs=turfs, location=location, sport=sport, sort=sort)
+    def load():
+        rows, total = search.search_turfs(
+            get_db(), location=location, sport=sport, q=q, min_price=min_price,
+            max_price=max_price if max_price < 9999 else None, sort=sort, near=near, page=page)
+        return [dict(r) for r in rows], total
+    key = f'search:{location}|{sport}|{q}|{min_price}|{max_price}|{sort}|{near}|{page}'
+    turfs, total = cache.get_catalog().get_or_load(key, load)
+    pages = max(-(-total // search.PER_PAGE), 1)
+    return render_template('find_turfs.html', turfs=turfs, total=total, page=page, pages=pages,
+                           location=location, sport=sport, sort=sort, near=near)
 
-@app.route('/turf/<int:turf_id>')
+@bp.route('/turf/<int:turf_id>')
 def turf_detail(turf_id):
-    conn = get_db()
-    turf = conn.execute("SELECT * FROM turfs WHERE id=?", (turf_id,)).fetchone()
+    turf = get_turf(turf_id)
     if not turf:
-        return redirect(url_for('find_turfs'))
-    reviews = conn.execute("""
-        SELECT r.*, u.name as user_name FROM reviews r
-        JOIN users u ON r.user_id=u.id
-        WHERE r.turf_id=? ORDER BY r.created_at DESC
-    """, (turf_id,)).fetchall()
-    conn.close()
-
-    # Generate time slots
-    slots = []
-    today = date.today()
-    for h in range(6, 23):
-        slots.append(f"{h:02d}:00")
+        return redirect(url_for('.find_turfs'))
+    conn = get_db()
+    # Only the first page of reviews; the rest load from api_turf_reviews
+    first_reviews, next_cursor = pagination.keyset_page(
+        conn, reviews.REVIEW_SELECT, ["r.turf_id=?"], [turf_id], reviews.REVIEW_KEYS, limit=reviews.REVIEWS_PAGE)
+    star_counts = reviews.histogram(conn, turf_id)
+    grid = slots.get_grids().for_turf(turf)
 
-    return render_template('turf_detail.html', turf=turf, reviews=reviews, slots=slots, today=today.isoformat())
+    return render_template('turf_detail.html', turf=turf, reviews=first_reviews, next_cursor=next_cursor,
+                           star_counts=star_counts, slots=grid['starts'], end_slots=grid['ends'],
+                           today=date.today().isoformat())
 
-@app.route('/book/<int:turf_id>', methods=['GET', 'POST'])
+@bp.route('/book/<int:turf_id>', methods=['GET', 'POST'])
 @login_required
 def book(turf_id):
     conn = get_db()
-    turf = conn.execute("SELECT * FROM turfs WHERE id=?", (turf_id,)).fetchone()
+    turf = get_turf(turf_id)
     if not turf:
-        conn.close()
         flash('Turf not found.', 'danger')
-        return redirect(url_for('find_turfs'))
+        return redirect(url_for('.find_turfs'))
+    grid = slots.get_grids().for_turf(turf)
 
     if request.method == 'POST':
         try:
@@ -211,61 +306,61 @@ def book(turf_id):
             # Validation
             if not all([booking_date, start_time, end_time, sport]):
                 flash('Please fill in all required fields.', 'warning')
-                conn.close()
-                return redirect(url_for('book', turf_id=turf_id))
+                return redirect(url_for('.book', turf_id=turf_id))
 
             # Validate date is future
             try:
                 booking_dt = datetime.strptime(booking_date, '%Y-%m-%d').date()
                 if booking_dt < date.today():
                     flash('Please select a future date.', 'warning')
-                    conn.close()
-                    return redirect(url_for('book', turf_id=turf_id))
+                    return redirect(url_for('.book', turf_id=turf_id))
             except ValueError:
                 flash('Invalid date format.', 'danger')
-                conn.close()
-                return redirect(url_for('book', turf_id=turf_id))
+                return redirect(url_for('.book', turf_id=turf_id))
 
             # Validate times
             try:
-                start_h = int(start_time.split(':')[0])
-                end_h = int(end_time.split(':')[0])
-                if end_h <= start_h:
+                start_m = parse_time(start_time)
+                end_m = parse_time(end_time)
+                start_time, end_time = normalize_time(start_time), normalize_time(end_time)
+                if end_m <= start_m:
                     flash('End time must be after start time.', 'warning')
-                    conn.close()
-                    return redirect(url_for('book', turf_id=turf_id))
+                    return redirect(url_for('.book', turf_id=turf_id))
+                if not slots.allows(grid, start_time, end_time):
+                    flash(f'Pick whole {grid["minutes"]}-minute slots within opening hours ({slots.describe(grid)}).', 'warning')
+                    return redirect(url_for('.book', turf_id=turf_id))
             except (ValueError, IndexError):
                 flash('Invalid time format.', 'danger')
-                conn.close()
-                return redirect(url_for('book', turf_id=turf_id))
+                return redirect(url_for('.book', turf_id=turf_id))
 
             # Validate players
             try:
                 players = int(players)
                 if players < 1 or players > turf['max_players']:
                     flash(f'Players must be between 1 and {turf["max_players"]}.', 'warning')
-                    conn.close()
-                    return redirect(url_for('book', turf_id=turf_id))
+                    return redirect(url_for('.book', turf_id=turf_id))
             except ValueError:
                 flash('Invalid player count.', 'danger')
-                conn.close()
-                return redirect(url_for('book', turf_id=turf_id))
+                return redirect(url_for('.book', turf_id=turf_id))
 
-            # Check for conflicts
-            conflict = conn.execute("""
-                SELECT id FROM bookings
-                WHERE turf_id=? AND booking_date=? AND status='confirmed'
-                AND NOT (end_time <= ? OR start_time >= ?)
-            """, (turf_id, booking_date, start_time, end_time)).fetchone()
+            # Calculate duration & amount
+            duration = duration_hours(start_time, end_time)
+            total = quote_booking(turf_id, booking_date, start_time, end_time)
 
-            if conflict:
+            # Hold the slot until confirm_booking; until it expires nobody else can take it
+            previous = session.get('pending_booking', {})
+            try:
+                hold_id, hold_expires = place_hold(
+                    conn, session['user_id'], turf_id, booking_date, start_time, end_time,
+                    ttl=current_app.config.get('HOLD_TTL', booking.HOLD_TTL),
+                    replace=previous.get('hold_id'))
+            except SlotConflict:
                 flash('This slot is already booked. Please choose another time.', 'danger')
-                conn.close()
-                return redirect(url_for('book', turf_id=turf_id))
-
-            # Calculate duration & amount
-            duration = end_h - start_h
-            total = duration * turf['price_per_hour']
+                return redirect(url_for('.book', turf_id=turf_id))
+            slots_cache = availability.get_cache()
+            slots_cache.invalidate(turf_id, booking_date)
+            if previous.get('hold_id'):
+                slots_cache.invalidate(previous['turf_id'], previous['booking_date'])
 
             # Store temporary booking data in session for confirmation
             session['pending_booking'] = {
@@ -279,123 +374,124 @@ def book(turf_id):
                 'total_amount': total,
                 'sport': sport,
                 'players': players,
-                'price_per_hour': turf['price_per_hour']
+                # Average rate over the slot; peak/off-peak hours may differ
+                'price_per_hour': round(total / duration),
+                'hold_id': hold_id,
+                'hold_expires': datetime.fromtimestamp(hold_expires).strftime('%H:%M'),
             }
             session.modified = True
-            conn.close()
-            return redirect(url_for('confirm_booking'))
+            return redirect(url_for('.confirm_booking'))
 
         except Exception as e:
             flash(f'An error occurred: {str(e)}', 'danger')
-            conn.close()
-            return redirect(url_for('book', turf_id=turf_id))
+            return redirect(url_for('.book', turf_id=turf_id))
 
-    conn.close()
     today = date.today().isoformat()
-    slots = [f"{h:02d}:00" for h in range(6, 24)]
-    return render_template('book.html', turf=turf, today=today, slots=slots)
+    return render_template('book.html', turf=turf, today=today, slots=grid['starts'], end_slots=grid['ends'])
 
-@app.route('/dashboard')
+DASHBOARD_SELECT = """
+    SELECT b.*, t.name as turf_name, t.location, t.price_per_hour
+    FROM all_bookings b JOIN turfs t ON b.turf_id=t.id
+"""
+DASHBOARD_PAST_PAGE = 20
+
+@bp.route('/dashboard')
 @login_required
 def dashboard():
     conn = get_db()
-    bookings = conn.execute("""
-        SELECT b.*, t.name as turf_name, t.location, t.price_per_hour
-        FROM bookings b JOIN turfs t ON b.turf_id=t.id
-        WHERE b.user_id=? ORDER BY b.booking_date DESC, b.start_time DESC
-    """, (session['user_id'],)).fetchall()
-    user = conn.execute("SELECT * FROM users WHERE id=?", (session['user_id'],)).fetchone()
-    conn.close()
+    user_id, today = session['user_id'], date.today().isoformat()
+    # Both halves are range scans of idx_bookings_user_date, which also
+    # carries status, so only the rows shown are read from the table
+    upcoming = conn.execute(DASHBOARD_SELECT + """
+        WHERE b.user_id=? AND b.booking_date >= ? AND b.status='confirmed'
+        ORDER BY b.booking_date DESC, b.start_time DESC
+    """, (user_id, today)).fetchall()
+    keys = [('b.booking_date', 'booking_date'), ('b.id', 'id')]
+    past, next_cursor = pagination.keyset_page(
+        conn, DASHBOARD_SELECT, ["b.user_id=?", "(b.booking_date < ? OR b.status != 'confirmed')"], [user_id, today],
+        keys, pagination.decode_cursor(request.args.get('cursor'), keys), limit=DASHBOARD_PAST_PAGE)
+    # Counts and spend come from the trigger-maintained summary, not a scan
+    user = conn.execute("""
+        SELECT u.*, COALESCE(s.bookings, 0) AS booking_count, COALESCE(s.spent, 0) AS spent
+        FROM users u LEFT JOIN user_booking_stats s ON s.user_id=u.id WHERE u.id=?
+    """, (user_id,)).fetchone()
 
-    upcoming = [b for b in bookings if b['booking_date'] >= date.today().isoformat() and b['status'] == 'confirmed']
-    past = [b for b in bookings if b['booking_date'] < date.today().isoformat() or b['status'] != 'confirmed']
+    return render_template('dashboard.html', user=user, upcoming=upcoming, past=past,
+                           past_count=user['booking_count'] - len(upcoming), next_url=next_page_url(next_cursor))
 
-    return render_template('dashboard.html', user=user, upcoming=upcoming, past=past)
+def queue_booking_jobs(conn, booking_id):
+    """Side effects of a new booking, run by the job workers off the request path."""
+    jobs.enqueue(conn, 'send_receipt', {'booking_id': booking_id})
+    jobs.enqueue(conn, 'reconcile_payment', {'booking_id': booking_id},
+                 delay=current_app.config.get('PAYMENT_RECONCILE_DELAY', 60))
 
-@app.route('/confirm-booking', methods=['GET', 'POST'])
+@bp.route('/confirm-booking', methods=['GET', 'POST'])
 @login_required
 def confirm_booking():
     """Shows booking confirmation page"""
     if 'pending_booking' not in session:
         flash('No pending booking found.', 'warning')
-        return redirect(url_for('find_turfs'))
+        return redirect(url_for('.find_turfs'))
 
     if request.method == 'POST':
         try:
             pending = session.get('pending_booking')
             conn = get_db()
-            
-            # Double-check no conflict exists
-            conflict = conn.execute("""
-                SELECT id FROM bookings
-                WHERE turf_id=? AND booking_date=? AND status='confirmed'
-                AND NOT (end_time <= ? OR start_time >= ?)
-            """, (pending['turf_id'], pending['booking_date'], 
-                   pending['start_time'], pending['end_time'])).fetchone()
-
-            if conflict:
-                conn.close()
+
+            # Re-quote: pricing rules may have changed since the user clicked Book
+            total = quote_booking(pending['turf_id'], pending['booking_date'], pending['start_time'], pending['end_time'])
+            if total != pending['total_amount']:
+                pending.update(total_amount=total, price_per_hour=round(total / pending['duration_hours']))
+                session.modified = True
+                flash('The price for this slot has changed. Please review the new total.', 'warning')
+                return redirect(url_for('.confirm_booking'))
+
+            # Conflict check, insert and the follow-up jobs commit atomically under the write lock
+            try:
+                booking_id = create_booking(conn, session['user_id'], pending, on_insert=queue_booking_jobs)
+                availability.get_cache().mark_booked(pending['turf_id'], pending['booking_date'],
+                                                     pending['start_time'], pending['end_time'], session['user_id'])
+                jobs.get_queue().notify()
+            except SlotConflict:
                 flash('Sorry, this slot was just booked. Please select another time.', 'danger')
+                if pending.get('hold_id'):
+                    release_hold(conn, pending['hold_id'], session['user_id'])
+                    availability.get_cache().invalidate(pending['turf_id'], pending['booking_date'])
                 session.pop('pending_booking', None)
-                return redirect(url_for('find_turfs'))
-
-            # Create the booking
-            conn.execute("""
-                INSERT INTO bookings 
-                (user_id, turf_id, booking_date, start_time, end_time, duration_hours, total_amount, sport, players, status, payment_status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'confirmed', 'pending')
-            """, (
-                session['user_id'],
-                pending['turf_id'],
-                pending['booking_date'],
-                pending['start_time'],
-                pending['end_time'],
-                pending['duration_hours'],
-                pending['total_amount'],
-                pending['sport'],
-                pending['players']
-            ))
-            conn.commit()
-            
-            # Get the booking ID
-            booking_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-            conn.close()
-            
+                return redirect(url_for('.find_turfs'))
+
             # Clear pending booking
             session.pop('pending_booking', None)
             session.modified = True
             
             flash('✅ Booking confirmed successfully! Your booking is now active.', 'success')
-            return redirect(url_for('booking_receipt', booking_id=booking_id))
+            return redirect(url_for('.booking_receipt', booking_id=booking_id))
 
         except Exception as e:
-            conn.close() if conn else None
             flash(f'Error confirming booking: {str(e)}', 'danger')
-            return redirect(url_for('find_turfs'))
+            return redirect(url_for('.find_turfs'))
 
     pending = session.get('pending_booking', {})
     return render_template('confirm_booking.html', booking=pending)
 
-@app.route('/booking-receipt/<int:booking_id>')
+@bp.route('/booking-receipt/<int:booking_id>')
 @login_required
 def booking_receipt(booking_id):
     """Shows booking receipt"""
     conn = get_db()
     booking = conn.execute("""
         SELECT b.*, t.name as turf_name, t.location, t.image_url, t.amenities
-        FROM bookings b JOIN turfs t ON b.turf_id=t.id
+        FROM all_bookings b JOIN turfs t ON b.turf_id=t.id
         WHERE b.id=? AND b.user_id=?
     """, (booking_id, session['user_id'])).fetchone()
     
     if not booking:
-        conn.close()
         flash('Booking not found.', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     
-    conn.close()
     return render_template('booking_receipt.html', booking=booking)
 
-@app.route('/cancel-booking/<int:booking_id>', methods=['POST'])
+@bp.route('/cancel-booking/<int:booking_id>', methods=['POST'])
 @login_required
 def cancel_booking(booking_id):
     try:
@@ -411,96 +507,111 @@ def cancel_booking(booking_id):
             elif hours_until < 24 and hours_until >= 0:
                 flash('Cancellation fee may apply for bookings within 24 hours.', 'info')
                 conn.execute("UPDATE bookings SET status='cancelled' WHERE id=?", (booking_id,))
+                jobs.enqueue(conn, 'reconcile_payment', {'booking_id': booking_id})
                 conn.commit()
+                jobs.get_queue().notify()
+                availability.get_cache().refresh(conn, booking['turf_id'], booking['booking_date'])
                 flash('Booking cancelled successfully.', 'success')
             else:
                 conn.execute("UPDATE bookings SET status='cancelled' WHERE id=?", (booking_id,))
+                jobs.enqueue(conn, 'reconcile_payment', {'booking_id': booking_id})
                 conn.commit()
+                jobs.get_queue().notify()
+                availability.get_cache().refresh(conn, booking['turf_id'], booking['booking_date'])
                 flash('Booking cancelled successfully. Refund will be processed in 24-48 hours.', 'success')
         else:
             flash('Booking not found.', 'danger')
-        conn.close()
     except Exception as e:
         flash(f'Error cancelling booking: {str(e)}', 'danger')
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('.dashboard'))
 
-@app.route('/review/<int:turf_id>', methods=['POST'])
+@bp.route('/review/<int:turf_id>', methods=['POST'])
 @login_required
 def add_review(turf_id):
     rating = request.form.get('rating', type=int)
     comment = request.form.get('comment', '')
+    if rating is None or not 1 <= rating <= 5:
+        flash('Please choose a rating between 1 and 5.', 'warning')
+        return redirect(url_for('.turf_detail', turf_id=turf_id))
     conn = get_db()
     # Check user has booked this turf
-    booked = conn.execute("SELECT id FROM bookings WHERE user_id=? AND turf_id=?", (session['user_id'], turf_id)).fetchone()
+    booked = conn.execute("SELECT 1 FROM all_bookings WHERE user_id=? AND turf_id=? LIMIT 1", (session['user_id'], turf_id)).fetchone()
     if not booked:
         flash('You can only review turfs you have booked.', 'warning')
     else:
-        existing = conn.execute("SELECT id FROM reviews WHERE user_id=? AND turf_id=?", (session['user_id'], turf_id)).fetchone()
-        if existing:
-            conn.execute("UPDATE reviews SET rating=?, comment=? WHERE id=?", (rating, comment, existing['id']))
-        else:
-            conn.execute("INSERT INTO reviews (user_id,turf_id,rating,comment) VALUES (?,?,?,?)", (session['user_id'], turf_id, rating, comment))
-        # Update turf avg rating
-        avg = conn.execute("SELECT AVG(rating), COUNT(*) FROM reviews WHERE turf_id=?", (turf_id,)).fetchone()
-        conn.execute("UPDATE turfs SET rating=?, review_count=? WHERE id=?", (round(avg[0], 1), avg[1], turf_id))
+        # Turf rating totals are adjusted by trigger (see reviews.py)
+        conn.execute(reviews.UPSERT_SQL, (session['user_id'], turf_id, rating, comment))
         conn.commit()
+        cache.get_catalog().bump()
         flash('Review submitted! Thanks.', 'success')
-    conn.close()
-    return redirect(url_for('turf_detail', turf_id=turf_id))
+    return redirect(url_for('.turf_detail', turf_id=turf_id))
 
 # ─── AUTH ─────────────────────────────────────────────────────
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if 'user_id' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     if request.method == 'POST':
         email = request.form['email']
-        password = hash_password(request.form['password'])
         conn = get_db()
-        user = conn.execute("SELECT * FROM users WHERE email=? AND password=?", (email, password)).fetchone()
-        conn.close()
-        if user:
+        user = conn.execute("SELECT * FROM users WHERE email=?", (email,)).fetchone()
+        try:
+            if user:
+                ok, new_hash = passwords.get_hasher().check(request.form['password'], user['password'])
+            else:
+                ok, new_hash = passwords.get_hasher().reject(request.form['password'])
+        except passwords.PasswordHasherBusy:
+            flash('We are handling a lot of logins right now. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503
+        if ok:
+            if new_hash:
+                # Legacy SHA-256 or outdated cost: store the current KDF hash, unless it changed meanwhile
+                conn.execute("UPDATE users SET password=? WHERE id=? AND password=?", (new_hash, user['id'], user['password']))
+                conn.commit()
+            session.regenerate()
             session['user_id'] = user['id']
             session['user_name'] = user['name']
             session['role'] = user['role']
             flash(f'Welcome back, {user["name"]}!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         else:
             flash('Invalid email or password.', 'danger')
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         name = request.form['name']
         email = request.form['email']
         phone = request.form['phone']
-        password = hash_password(request.form['password'])
         conn = get_db()
         try:
+            password = passwords.get_hasher().make(request.form['password'])
             conn.execute("INSERT INTO users (name,email,phone,password) VALUES (?,?,?,?)", (name, email, phone, password))
             conn.commit()
             user = conn.execute("SELECT * FROM users WHERE email=?", (email,)).fetchone()
+            session.regenerate()
             session['user_id'] = user['id']
             session['user_name'] = user['name']
             session['role'] = 'user'
             flash('Account created successfully! 🎉', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         except sqlite3.IntegrityError:
             flash('Email already registered. Please login.', 'danger')
-        finally:
-            conn.close()
+        except passwords.PasswordHasherBusy:
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'warning')
     return render_template('register.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.clear()
+    session.regenerate()
     flash('Logged out successfully.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('.index'))
 
-@app.route('/profile', methods=['GET', 'POST'])
+@bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
     conn = get_db()
@@ -512,115 +623,482 @@ def profile():
         session['user_name'] = name
         flash('Profile updated!', 'success')
     user = conn.execute("SELECT * FROM users WHERE id=?", (session['user_id'],)).fetchone()
-    conn.close()
     return render_template('profile.html', user=user)
 
 # ─── ADMIN ────────────────────────────────────────────────────
 
-@app.route('/admin')
+@bp.route('/admin')
 @login_required
 @admin_required
 def admin_dashboard():
     conn = get_db()
-    stats = {
-        'total_turfs': conn.execute("SELECT COUNT(*) FROM turfs").fetchone()[0],
-        'total_users': conn.execute("SELECT COUNT(*) FROM users WHERE role='user'").fetchone()[0],
-        'total_bookings': conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0],
-        'total_revenue': conn.execute("SELECT SUM(total_amount) FROM bookings WHERE status='confirmed'").fetchone()[0] or 0,
-    }
+    # Counters and rollups are kept current by triggers (see aggregates.py)
+    stats = aggregates.counters(conn)
     recent_bookings = conn.execute("""
         SELECT b.*, u.name as user_name, t.name as turf_name
         FROM bookings b JOIN users u ON b.user_id=u.id JOIN turfs t ON b.turf_id=t.id
-        ORDER BY b.created_at DESC LIMIT 10
+        ORDER BY b.id DESC LIMIT 10
     """).fetchall()
-    conn.close()
-    return render_template('admin/dashboard.html', stats=stats, recent_bookings=recent_bookings)
+    revenue = aggregates.revenue_by_day(conn)
+    utilization = aggregates.turf_utilization(conn)
+    return render_template('admin/dashboard.html', stats=stats, recent_bookings=recent_bookings,
+                           revenue=revenue, max_revenue=max([r[1] for r in revenue] + [1]),
+                           utilization=utilization, max_hours=max([u['hours'] for u in utilization] + [1]))
+
+def render_listing(template, **context):
+    """Render an admin list page. ?stream=1 streams it row by row instead of
+    building the whole page in memory; rows is then a lazy cursor iterator."""
+    if request.args.get('stream') != '1':
+        return render_template(template, **context)
+    current_app.update_template_context(context)
+    return Response(stream_with_context(current_app.jinja_env.get_template(template).generate(context)))
+
+def list_page(select, where, params, keys):
+    """Rows for an admin listing: one keyset page, or a lazy iterator when streaming."""
+    conn = get_db()
+    cursor = pagination.decode_cursor(request.args.get('cursor'), keys)
+    if request.args.get('stream') == '1':
+        return pagination.iter_rows(conn, select, where, params, keys, cursor), None
+    limit = min(max(request.args.get('limit', pagination.DEFAULT_LIMIT, type=int), 1), pagination.MAX_LIMIT)
+    return pagination.keyset_page(conn, select, where, params, keys, cursor, limit)
+
+def next_page_url(next_cursor):
+    if not next_cursor:
+        return None
+    args = request.args.to_dict()
+    args['cursor'] = next_cursor
+    return url_for(request.endpoint, **args)
 
-@app.route('/admin/turfs')
+@bp.route('/admin/turfs')
 @login_required
 @admin_required
 def admin_turfs():
-    conn = get_db()
-    turfs = conn.execute("SELECT * FROM turfs ORDER BY id DESC").fetchall()
-    conn.close()
-    return render_template('admin/turfs.html', turfs=turfs)
+    where, params = [], []
+    if request.args.get('active') in ('0', '1'):
+        where.append("is_active=?")
+        params.append(int(request.args['active']))
+    if request.args.get('city'):
+        where.append("city=?")
+        params.append(request.args['city'])
+    turfs, next_cursor = list_page("SELECT * FROM turfs", where, params, [('id', 'id')])
+    return render_listing('admin/turfs.html', turfs=turfs, next_url=next_page_url(next_cursor))
 
-@app.route('/admin/turf/add', methods=['GET', 'POST'])
-@app.route('/sports')
+@bp.route('/sports')
+@conditional_page
 def sports_categories():
     return render_template('sports.html')
 
-@app.route('/about-us')
+@bp.route('/about-us')
+@conditional_page
 def about_us():
     return render_template('about_us.html')
+
+@bp.route('/admin/turf/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def admin_add_turf():
     if request.method == 'POST':
+        try:
+            slots.operating_ranges(request.form.get('open_time', '6 AM'), request.form.get('close_time', '11 PM'))
+        except ValueError:
+            flash("Opening hours must look like '6 AM' or '17:30'.", 'danger')
+            return render_template('admin/add_turf.html')
         conn = get_db()
-        conn.execute("""
-            INSERT INTO turfs (name,location,city,distance,price_per_hour,sports,amenities,open_time,close_time,max_players,description)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+        # turfs_fts is updated by trigger; the sports join table is ours to keep in sync
+        cur = conn.execute("""
+            INSERT INTO turfs (name,location,city,distance,price_per_hour,sports,amenities,open_time,close_time,max_players,description,lat,lon)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
         """, (
             request.form['name'], request.form['location'], request.form['city'],
             request.form.get('distance', 0), request.form['price_per_hour'],
             request.form['sports'], request.form.get('amenities',''),
             request.form.get('open_time','6 AM'), request.form.get('close_time','11 PM'),
-            request.form.get('max_players', 22), request.form.get('description','')
+            request.form.get('max_players', 22), request.form.get('description',''),
+            request.form.get('lat', type=float), request.form.get('lon', type=float)
         ))
+        search.sync_sports(conn, cur.lastrowid, request.form['sports'])
         conn.commit()
-        conn.close()
+        cache.get_catalog().bump()
         flash('Turf added successfully!', 'success')
-        return redirect(url_for('admin_turfs'))
+        return redirect(url_for('.admin_turfs'))
     return render_template('admin/add_turf.html')
 
-@app.route('/admin/turf/delete/<int:turf_id>', methods=['POST'])
+@bp.route('/admin/turf/delete/<int:turf_id>', methods=['POST'])
 @login_required
 @admin_required
 def admin_delete_turf(turf_id):
     conn = get_db()
     conn.execute("UPDATE turfs SET is_active=0 WHERE id=?", (turf_id,))
     conn.commit()
-    conn.close()
+    cache.get_catalog().bump()
     flash('Turf deactivated.', 'info')
-    return redirect(url_for('admin_turfs'))
+    return redirect(url_for('.admin_turfs'))
 
-@app.route('/admin/bookings')
+@bp.route('/admin/turf/<int:turf_id>/pricing', methods=['GET', 'POST'])
 @login_required
 @admin_required
-def admin_bookings():
+def admin_turf_pricing(turf_id):
     conn = get_db()
-    bookings = conn.execute("""
+    turf = conn.execute("SELECT * FROM turfs WHERE id=?", (turf_id,)).fetchone()
+    if not turf:
+        flash('Turf not found.', 'danger')
+        return redirect(url_for('.admin_turfs'))
+    if request.method == 'POST':
+        f = request.form
+        days = ''.join(sorted(set(f.getlist('days')) & set('0123456')))
+        start_hour = f.get('start_hour', 0, type=int)
+        end_hour = f.get('end_hour', 24, type=int)
+        if not days or not 0 <= start_hour < 24 or not 0 <= end_hour <= 24 or start_hour == end_hour:
+            flash('Pick at least one day and a non-empty hour range.', 'warning')
+            return redirect(url_for('.admin_turf_pricing', turf_id=turf_id))
+        conn.execute("""
+            INSERT INTO pricing_rules (turf_id, name, days, start_hour, end_hour, multiplier, flat, min_demand, priority)
+            VALUES (?,?,?,?,?,?,?,?,?)
+        """, (None if f.get('all_turfs') else turf_id, f.get('name', ''), days, start_hour, end_hour,
+              f.get('multiplier', 1.0, type=float), f.get('flat', type=int), f.get('min_demand', type=float),
+              f.get('priority', 0, type=int)))
+        conn.commit()
+        pricing.get_grids().invalidate()
+        flash('Pricing rule added.', 'success')
+        return redirect(url_for('.admin_turf_pricing', turf_id=turf_id))
+    return render_template('admin/pricing.html', turf=turf, rules=pricing.load_rules(conn, turf_id),
+                           grid=pricing.get_grids().get(turf_id, get_db), day_names=pricing.DAY_NAMES)
+
+@bp.route('/admin/pricing/<int:rule_id>/delete', methods=['POST'])
+@login_required
+@admin_required
+def admin_delete_pricing_rule(rule_id):
+    conn = get_db()
+    conn.execute("DELETE FROM pricing_rules WHERE id=?", (rule_id,))
+    conn.commit()
+    pricing.get_grids().invalidate()
+    flash('Pricing rule removed.', 'info')
+    turf_id = request.form.get('turf_id', type=int)
+    return redirect(url_for('.admin_turf_pricing', turf_id=turf_id) if turf_id else url_for('.admin_turfs'))
+
+def booking_filters(args):
+    """WHERE clauses for the admin booking filters (status, turf, user, date range)."""
+    where, params = [], []
+    if args.get('status'):
+        where.append("b.status=?")
+        params.append(args['status'])
+    for column, key in (('b.turf_id', 'turf_id'), ('b.user_id', 'user_id')):
+        value = args.get(key, type=int)
+        if value:
+            where.append(f"{column}=?")
+            params.append(value)
+    if args.get('from'):
+        where.append("b.booking_date >= ?")
+        params.append(args['from'])
+    if args.get('to'):
+        where.append("b.booking_date <= ?")
+        params.append(args['to'])
+    return where, params
+
+@bp.route('/admin/bookings')
+@login_required
+@admin_required
+def admin_bookings():
+    where, params = booking_filters(request.args)
+    bookings, next_cursor = list_page("""
         SELECT b.*, u.name as user_name, t.name as turf_name
-        FROM bookings b JOIN users u ON b.user_id=u.id JOIN turfs t ON b.turf_id=t.id
-        ORDER BY b.booking_date DESC
-    """).fetchall()
-    conn.close()
-    return render_template('admin/bookings.html', bookings=bookings)
+        FROM all_bookings b JOIN users u ON b.user_id=u.id JOIN turfs t ON b.turf_id=t.id
+    """, where, params, [('b.booking_date', 'booking_date'), ('b.id', 'id')])
+    return render_listing('admin/bookings.html', bookings=bookings,
+                          filters=request.args, next_url=next_page_url(next_cursor))
 
-@app.route('/admin/users')
+@bp.route('/admin/users')
 @login_required
 @admin_required
 def admin_users():
-    conn = get_db()
-    users = conn.execute("SELECT * FROM users ORDER BY id DESC").fetchall()
-    conn.close()
-    return render_template('admin/users.html', users=users)
+    where, params = [], []
+    if request.args.get('role'):
+        where.append("role=?")
+        params.append(request.args['role'])
+    users, next_cursor = list_page("SELECT * FROM users", where, params, [('id', 'id')])
+    return render_listing('admin/users.html', users=users, next_url=next_page_url(next_cursor))
+
+@bp.route('/admin/export/<kind>')
+@login_required
+@admin_required
+def admin_export(kind):
+    """Streams ?format=csv|ndjson of bookings/revenue/users/turfs, optionally &gzip=1."""
+    fmt = request.args.get('format', 'csv')
+    if kind not in export.EXPORTS or fmt not in export.FORMATS:
+        flash('Unknown export.', 'danger')
+        return redirect(url_for('.admin_dashboard'))
+    gz = request.args.get('gzip') == '1'
+    filename = f"{kind}-{date.today().strftime('%Y%m%d')}.{fmt}" + ('.gz' if gz else '')
+    chunks = export.stream(get_db(), kind, fmt, request.args.get('from'), request.args.get('to'), gzip=gz)
+    return Response(stream_with_context(chunks),
+                    mimetype='application/gzip' if gz else export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@bp.route('/admin/perf')
+@login_required
+@admin_required
+def admin_perf():
+    registry = perf.get_registry()
+    return render_template('admin/perf.html', enabled=current_app.config['PERF_ENABLED'],
+                           endpoints=registry.summary(), slow_queries=list(registry.slow_queries),
+                           pool=db.get_pool().stats(), catalog=cache.get_catalog().stats(),
+                           availability=availability.get_cache().stats())
+
+@bp.route('/admin/api/db-stats')
+@login_required
+@admin_required
+def admin_db_stats():
+    return jsonify({
+        'pool': db.get_pool().stats(),
+        'availability': availability.get_cache().stats(),
+        'catalog': cache.get_catalog().stats(),
+        'jobs': jobs.get_queue().stats(get_db()),
+        'pricing': pricing.get_grids().stats(),
+        'sessions': sessions.get_store().stats(),
+        'archive': archive.stats(get_db()),
+        'admission': admission.get_admission().stats(),
+    })
 
 # ─── API ──────────────────────────────────────────────────────
 
-@app.route('/api/slots/<int:turf_id>')
+@bp.route('/api/slots/<int:turf_id>')
 def api_slots(turf_id):
-    date_str = request.args.get('date')
+    date_str = request.args.get('date', '')
+    try:
+        datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    # Served from the in-memory caches; get_db is only called on a miss
+    bitmap, holds = availability.get_cache().get(turf_id, date_str, get_db)
+    # The caller's own hold is theirs to book, as in find_conflict
+    held = availability.held_mask(holds, session.get('user_id')) & ~bitmap
+    grid = pricing.get_grids().get(turf_id, get_db)
+    prices = grid[datetime.strptime(date_str, '%Y-%m-%d').weekday()] if grid else None
+    slot_grid = slots.get_grids().get(turf_id, get_db)
+    # Built from the data itself (ints hash the same in every process), never a per-worker counter
+    shape = (slot_grid['minutes'], *map(tuple, slot_grid['ranges'])) if slot_grid else ()
+    etag = (f'{turf_id}-{date_str}-{bitmap:x}-{held:x}-{hash(shape) & 0xffffffff:x}'
+            f'-{hash(tuple(prices or ())) & 0xffffffff:x}')
+    if request.if_none_match.contains_weak(etag):
+        return '', 304, {'ETag': f'"{etag}"'}
+    resp = jsonify({
+        'booked': availability.booked_ranges(bitmap),
+        'bitmap': availability.to_hex(bitmap),
+        'held': availability.booked_ranges(held),
+        'held_bitmap': availability.to_hex(held),
+        'slot_minutes': availability.SLOT_MINUTES,
+        'slots': slots.slot_states(slot_grid, bitmap, held) if slot_grid else [],
+        'prices': prices,
+    })
+    resp.set_etag(etag)
+    # Holds are shown relative to the signed-in user, so never from a shared cache
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+@bp.route('/api/turfs/nearby')
+def api_nearby_turfs():
+    """k nearest active turfs to ?lat=&lon=, optionally within ?radius= km."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        return jsonify({'error': 'lat and lon are required.'}), 400
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    radius = request.args.get('radius', type=float)
+    turfs = geo.nearest(
+        get_db(), lat, lon, k=k, radius_km=min(radius, geo.MAX_RADIUS_KM) if radius else None)
+    return jsonify({'turfs': [
+        {'id': t['id'], 'name': t['name'], 'location': t['location'], 'city': t['city'],
+         'price_per_hour': t['price_per_hour'], 'rating': t['rating'], 'distance_km': t['distance']}
+        for t in turfs
+    ]})
+
+@bp.route('/api/turfs/<int:turf_id>/reviews')
+def api_turf_reviews(turf_id):
+    """Newest-first reviews after ?cursor=, one page at a time."""
+    limit = min(max(request.args.get('limit', reviews.REVIEWS_PAGE, type=int), 1), 50)
+    rows, next_cursor = pagination.keyset_page(
+        get_db(), reviews.REVIEW_SELECT, ["r.turf_id=?"], [turf_id], reviews.REVIEW_KEYS,
+        pagination.decode_cursor(request.args.get('cursor'), reviews.REVIEW_KEYS), limit)
+    return jsonify({'reviews': [dict(r) for r in rows], 'next_cursor': next_cursor})
+
+def parse_occurrences(body, grid=None):
+    """(date, start, end) tuples from an explicit 'occurrences' list or a 'recurrence' rule.
+
+    With a slot grid, every occurrence must also fit the turf's opening hours.
+    """
+    today = date.today()
+    if 'recurrence' in body:
+        rule = body['recurrence']
+        until = rule.get('until')
+        dates = expand_recurrence(
+            datetime.strptime(rule['start_date'], '%Y-%m-%d').date(), count=rule.get('count'),
+            until=datetime.strptime(until, '%Y-%m-%d').date() if until else None,
+            every=rule.get('every', 'week'), interval=int(rule.get('interval', 1)))
+        raw = [(d, rule['start'], rule['end']) for d in dates]
+    else:
+        raw = [(datetime.strptime(o['date'], '%Y-%m-%d').date(), o['start'], o['end'])
+               for o in body.get('occurrences', [])]
+    if not raw or len(raw) > MAX_OCCURRENCES:
+        raise BookingError(f'Send between 1 and {MAX_OCCURRENCES} occurrences.')
+    occurrences = []
+    for day, start, end in raw:
+        if day < today:
+            raise BookingError(f'{day.isoformat()} is in the past.')
+        if parse_time(end) <= parse_time(start):
+            raise BookingError(f'End time must be after start time on {day.isoformat()}.')
+        if grid and not slots.allows(grid, start, end):
+            raise BookingError(f'{start}-{end} on {day.isoformat()} is not a whole number of slots '
+                               f'within opening hours ({slots.describe(grid)}).')
+        occurrences.append((day.isoformat(), normalize_time(start), normalize_time(end)))
+    return occurrences
+
+@bp.route('/api/turfs/<int:turf_id>/bookings', methods=['POST'])
+def api_bulk_booking(turf_id):
+    """Book a series in one transaction and report on every occurrence.
+
+    JSON: {"sport", "players", "all_or_nothing": false, and either
+    "occurrences": [{"date", "start", "end"}, ...] or
+    "recurrence": {"start_date", "start", "end", "every": "week", "interval": 1, "count" | "until"}}
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required.'}), 401
+    turf = get_turf(turf_id)
+    if not turf or not turf['is_active']:
+        return jsonify({'error': 'Turf not found.'}), 404
+    body = request.get_json(silent=True) or {}
+    try:
+        occurrences = parse_occurrences(body, slots.get_grids().for_turf(turf))
+        players = int(body.get('players', 1))
+    except (KeyError, TypeError, ValueError, IndexError):
+        return jsonify({'error': 'Invalid occurrences, recurrence or players.'}), 400
+    except BookingError as e:
+        return jsonify({'error': str(e)}), 400
+    if not body.get('sport'):
+        return jsonify({'error': 'sport is required.'}), 400
+    if not 1 <= players <= turf['max_players']:
+        return jsonify({'error': f'Players must be between 1 and {turf["max_players"]}.'}), 400
+
+    grid = pricing.get_grids().get(turf_id, get_db)
+    results = create_bulk_bookings(get_db(), session['user_id'], turf_id, occurrences, body['sport'], players,
+                                   lambda d, s, e: pricing.quote(grid, d, s, e),
+                                   atomic=bool(body.get('all_or_nothing')), on_insert=queue_booking_jobs)
+    slots_cache = availability.get_cache()
+    booked = [r for r in results if r['status'] == 'booked']
+    for r in booked:
+        slots_cache.mark_booked(turf_id, r['date'], r['start'], r['end'])
+    if booked:
+        jobs.get_queue().notify()
+    return jsonify({
+        'booked': len(booked),
+        'conflicts': sum(r['status'] == 'conflict' for r in results),
+        'total_amount': sum(r['amount'] for r in booked),
+        'results': results,
+    }), 201 if booked else 409
+
+AVAILABILITY_MAX_TURFS = 200
+AVAILABILITY_MAX_DAYS = 92
+AVAILABILITY_STREAM_CELLS = 2000   # turfs x days above which we stream NDJSON
+
+@bp.route('/api/availability')
+def api_availability():
+    """Booked-slot bitmaps for many turfs over a date range in one request.
+
+    ?turf_ids=1,2,3&start=YYYY-MM-DD&days=7 (or &end=YYYY-MM-DD, inclusive).
+    bitmaps[i] is the day start+i as a hex string; bit n set means slot n is booked.
+    held has the same shape for slots on hold by other users, for turfs that have any.
+    """
+    try:
+        turf_ids = sorted({int(t) for t in request.args.get('turf_ids', '').split(',') if t.strip()})
+        start = datetime.strptime(request.args.get('start', date.today().isoformat()), '%Y-%m-%d').date()
+        if 'end' in request.args:
+            days = (datetime.strptime(request.args['end'], '%Y-%m-%d').date() - start).days + 1
+        else:
+            days = request.args.get('days', 7, type=int)
+    except ValueError:
+        return jsonify({'error': 'Invalid turf_ids or date.'}), 400
+    if not turf_ids or len(turf_ids) > AVAILABILITY_MAX_TURFS:
+        return jsonify({'error': f'Pass between 1 and {AVAILABILITY_MAX_TURFS} turf_ids.'}), 400
+    if not 1 <= days <= AVAILABILITY_MAX_DAYS:
+        return jsonify({'error': f'Range must be 1-{AVAILABILITY_MAX_DAYS} days.'}), 400
+
     conn = get_db()
-    booked = conn.execute(
-        "SELECT start_time, end_time FROM bookings WHERE turf_id=? AND booking_date=? AND status='confirmed'",
-        (turf_id, date_str)
-    ).fetchall()
-    conn.close()
-    booked_slots = [{'start': b['start_time'], 'end': b['end_time']} for b in booked]
-    return jsonify({'booked': booked_slots})
+    header = {'start': start.isoformat(), 'days': days, 'slot_minutes': availability.SLOT_MINUTES}
+    held = availability.held_range(conn, turf_ids, start, days, session.get('user_id'))
+    grid = availability.iter_range(conn, turf_ids, start, days)
+
+    if request.args.get('format') == 'ndjson' or len(turf_ids) * days > AVAILABILITY_STREAM_CELLS:
+        def generate():
+            yield json.dumps(header) + '\n'
+            for turf_id, bitmaps in grid:
+                line = {'turf_id': turf_id, 'bitmaps': [availability.to_hex(b) for b in bitmaps]}
+                if turf_id in held:
+                    line['held'] = [availability.to_hex(h) for h in held[turf_id]]
+                yield json.dumps(line) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    return jsonify(dict(header, turfs={str(turf_id): [availability.to_hex(b) for b in bitmaps]
+                                       for turf_id, bitmaps in grid},
+                        held={str(turf_id): [availability.to_hex(h) for h in masks]
+                              for turf_id, masks in held.items()}))
+
+# ─── CLI ──────────────────────────────────────────────────────
+
+@bp.cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(export.EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(export.FORMATS)), default='csv')
+@click.option('--from', 'date_from', help='First date, YYYY-MM-DD.')
+@click.option('--to', 'date_to', help='Last date, YYYY-MM-DD.')
+@click.option('--gzip', 'gz', is_flag=True, help='Compress the output.')
+@click.option('-o', '--output', type=click.File('wb'), default='-')
+def export_command(kind, fmt, date_from, date_to, gz, output):
+    """Stream an export to a file or stdout in constant memory."""
+    for chunk in export.stream(get_db(), kind, fmt, date_from, date_to, gzip=gz):
+        output.write(chunk if gz else chunk.encode())
+
+@bp.cli.command('rebuild-aggregates')
+def rebuild_aggregates_command():
+    """Recompute dashboard counters and daily rollups from the base tables."""
+    conn = get_db()
+    with db.immediate(conn):
+        aggregates.rebuild(conn)
+    click.echo('Aggregates rebuilt.')
+
+@bp.cli.command('reconcile-ratings')
+@click.option('--fix', is_flag=True, help='Correct any turfs whose totals have drifted.')
+def reconcile_ratings_command(fix):
+    """Verify turf rating totals against the reviews table."""
+    conn = get_db()
+    with db.immediate(conn):
+        drift = reviews.reconcile(conn, fix=fix)
+    for turf_id, stored_sum, stored_count, actual_sum, actual_count in drift:
+        click.echo(f'turf {turf_id}: stored {stored_sum}/{stored_count}, actual {actual_sum}/{actual_count}')
+    click.echo(f"{len(drift)} turf(s) {'fixed' if fix else 'out of sync'}.")
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint and precompress static files into static/dist."""
+    manifest = assets.build(current_app.static_folder)
+    click.echo(f'{len(manifest)} asset(s) built; restart workers to pick them up.')
+
+@bp.cli.command('archive-bookings')
+@click.option('--days', default=archive.ARCHIVE_AFTER_DAYS, show_default=True,
+              help='Archive bookings dated more than this many days ago.')
+@click.option('--batch', default=archive.BATCH_SIZE, show_default=True, help='Rows moved per transaction.')
+@click.option('--limit', type=int, help='Stop after this many rows.')
+def archive_bookings_command(days, batch, limit):
+    """Move old completed and cancelled bookings to bookings_archive (run from cron)."""
+    cutoff = archive.cutoff_date(days)
+    moved = archive.archive(get_db(), cutoff, batch, limit=limit)
+    click.echo(f'{moved} booking(s) dated before {cutoff} archived.')
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or migrate the schema. Run once before starting workers."""
+    init_db(current_app.config['DATABASE'])
+    click.echo('Database initialised.')
 
 if __name__ == '__main__':
+    # Development server only; use serve.py in production
     init_db()
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
@@ -0,0 +1,95 @@
+import time
+from datetime import date, timedelta
+
+from db import immediate
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# bookings holds what availability, conflict checks and cancellations need:
+# anything dated within the last ARCHIVE_AFTER_DAYS or later. Older rows,
+# which can only be completed or cancelled, move to bookings_archive. Read
+# paths that show history select from the all_bookings view; SQLite pushes
+# their WHERE and ORDER BY into both halves and merges the two index scans,
+# so keyset pages over the view stay cheap. Ids are AUTOINCREMENT in
+# bookings, so they stay unique across both tables. The aggregates have no
+# DELETE triggers, so moving rows leaves every counter alone.
+COLUMNS = ('id, user_id, turf_id, booking_date, start_time, end_time, duration_hours, total_amount, '
+           'sport, players, status, payment_status, created_at')
+
+SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS bookings_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        turf_id INTEGER NOT NULL,
+        booking_date TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        duration_hours REAL NOT NULL,
+        total_amount INTEGER NOT NULL,
+        sport TEXT NOT NULL,
+        players INTEGER,
+        status TEXT,
+        payment_status TEXT,
+        created_at TEXT,
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_bookings_archive_date_id ON bookings_archive(booking_date, id);
+    CREATE INDEX IF NOT EXISTS idx_bookings_archive_user_date
+        ON bookings_archive(user_id, booking_date, id, status);
+    CREATE INDEX IF NOT EXISTS idx_bookings_archive_turf_date ON bookings_archive(turf_id, booking_date);
+
+    CREATE VIEW IF NOT EXISTS all_bookings AS
+        SELECT {COLUMNS} FROM bookings
+        UNION ALL
+        SELECT {COLUMNS} FROM bookings_archive;
+'''
+
+ARCHIVE_AFTER_DAYS = 90
+BATCH_SIZE = 1000
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def cutoff_date(days=ARCHIVE_AFTER_DAYS):
+    if days < 1:
+        raise ValueError('Only bookings dated before today can be archived.')
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def archive_batch(conn, cutoff, batch=BATCH_SIZE):
+    """Move up to batch bookings dated before cutoff in one transaction. Returns how many moved."""
+    with immediate(conn):
+        rows = conn.execute(f"""
+            DELETE FROM bookings WHERE id IN (
+                SELECT id FROM bookings WHERE booking_date < ? ORDER BY booking_date, id LIMIT ?)
+            RETURNING {COLUMNS}
+        """, (cutoff, batch)).fetchall()
+        placeholders = ', '.join('?' * len(COLUMNS.split(',')))
+        conn.executemany(f"INSERT INTO bookings_archive ({COLUMNS}) VALUES ({placeholders})", rows)
+    return len(rows)
+
+
+def archive(conn, cutoff, batch=BATCH_SIZE, pause=0.05, limit=None):
+    """Archive everything before cutoff, batch by batch.
+
+    Each batch holds the write lock only briefly, and pause lets queued
+    bookings in between batches. Returns the total moved.
+    """
+    moved = 0
+    while limit is None or moved < limit:
+        n = archive_batch(conn, cutoff, batch if limit is None else min(batch, limit - moved))
+        moved += n
+        if n < batch:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def stats(conn):
+    return {
+        'hot': conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0],
+        'archived': conn.execute("SELECT COUNT(*) FROM bookings_archive").fetchone()[0],
+        'oldest_hot': conn.execute("SELECT MIN(booking_date) FROM bookings").fetchone()[0],
+    }
@@ -0,0 +1,10 @@
+"""ASGI entry point: uvicorn asgi:application --workers 4
+
+The Flask app is wrapped with asgiref's WsgiToAsgi; views run on its
+thread pool (sized by ASGI_THREADS).
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app
+
+application = WsgiToAsgi(create_app())
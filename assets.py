@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ─── BUILD ────────────────────────────────────────────────────
+# `flask build-assets` (also run by serve.py) copies every static file to
+# static/dist/ under a content-hash name, with .gz (and .br, when the
+# brotli package is installed) siblings for text formats. manifest.json
+# maps the source name to the fingerprinted one. Old fingerprints are
+# left in place so pages cached before a deploy still find their assets.
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map', '.html'}
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build(static_folder):
+    """Fingerprint and precompress static_folder into static_folder/dist. Returns the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder) and DIST in dirs:
+            dirs.remove(DIST)
+        for name in files:
+            source = os.path.join(root, name)
+            rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            target = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+            out = os.path.join(dist, target)
+            if not os.path.exists(out):
+                _write(out, data)
+                if ext.lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                    _write(out + '.gz', gzip.compress(data, 9, mtime=0))
+                    if brotli is not None:
+                        _write(out + '.br', brotli.compress(data, quality=11))
+            st = os.stat(source)
+            manifest[rel] = {'file': target, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def digest_tree(*folders):
+    """Short hash of the names, sizes and mtimes under folders (a deploy version)."""
+    h = hashlib.sha256()
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                st = os.stat(os.path.join(root, name))
+                h.update(f'{os.path.relpath(os.path.join(root, name), folder)}:{st.st_size}:{st.st_mtime_ns};'.encode())
+    return h.hexdigest()[:16]
+
+
+# ─── SERVING ──────────────────────────────────────────────────
+
+class Assets:
+    """Rewrites url_for('static', ...) to fingerprinted names and serves them.
+
+    Manifest entries whose source file changed since the build are ignored,
+    so an edited stylesheet is served unfingerprinted until the next build
+    rather than stale.
+    """
+
+    def __init__(self, static_folder, template_folder):
+        self.static_folder = static_folder
+        self.dist = os.path.join(static_folder, DIST)
+        self.files = {}
+        try:
+            with open(os.path.join(self.dist, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        for rel, entry in manifest.items():
+            try:
+                st = os.stat(os.path.join(static_folder, rel))
+            except OSError:
+                continue
+            if (st.st_size, st.st_mtime_ns) == (entry['size'], entry['mtime_ns']):
+                self.files[rel] = f"{DIST}/{entry['file']}"
+        # Changes whenever templates or static files do; part of page ETags
+        self.version = digest_tree(template_folder, static_folder)
+
+    def url_defaults(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+
+    def serve(self, filename):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.isfile(os.path.join(self.dist, filename + suffix)):
+                response = send_from_directory(self.dist, filename + suffix, mimetype=mimetype,
+                                               max_age=IMMUTABLE_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.dist, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    assets = Assets(app.static_folder, os.path.join(app.root_path, app.template_folder))
+    app.extensions['assets'] = assets
+    app.url_defaults(assets.url_defaults)
+    # More specific than the static route, so fingerprinted files land here
+    app.add_url_rule(f'{app.static_url_path}/{DIST}/<path:filename>', endpoint='assets', view_func=assets.serve)
+
+
+def get_assets():
+    return current_app.extensions['assets']
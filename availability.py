@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from flask import current_app
+
+from booking import parse_time, format_time
+
+# Bitmap resolution, the finest slot granularity slots.py can offer
+# (SLOT_MINUTES config must be a multiple of it).
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+TTL = 5                   # seconds an entry is served before SQLite is read again
+
+
+def minute_mask(start, end):
+    """Bitmask of every slot [start, end) minutes touches. Bit i = slot starting at i*SLOT_MINUTES."""
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)  # ceil
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def slot_mask(start_time, end_time):
+    return minute_mask(parse_time(start_time), parse_time(end_time))
+
+
+def to_hex(bitmap):
+    """Bitmap for JSON. A day is 96 bits, more than a double (so a browser's
+    JSON.parse) holds exactly, so it goes out as a hex string: BigInt('0x' + s)."""
+    return format(bitmap, 'x')
+
+
+def held_mask(holds, user_id=None, now=None):
+    """Bitmap of the slots in holds (from load_holds) held by anyone but user_id.
+
+    Holds lapse on their own, so expiry is checked here at read time rather
+    than when the holds were loaded.
+    """
+    now = time.time() if now is None else now
+    mask = 0
+    for holder, bits, expires_at in holds:
+        if expires_at > now and holder != user_id:
+            mask |= bits
+    return mask
+
+
+def booked_ranges(bitmap):
+    """Collapse a bitmap into contiguous {'start', 'end'} runs for the JSON API."""
+    runs, i = [], 0
+    while i < SLOTS_PER_DAY:
+        if bitmap >> i & 1:
+            j = i
+            while j < SLOTS_PER_DAY and bitmap >> j & 1:
+                j += 1
+            runs.append({'start': format_time(i * SLOT_MINUTES), 'end': format_time(j * SLOT_MINUTES)})
+            i = j
+        else:
+            i += 1
+    return runs
+
+
+def load_bitmap(conn, turf_id, booking_date):
+    bitmap = 0
+    for row in conn.execute(
+            "SELECT start_time, end_time FROM bookings WHERE turf_id=? AND booking_date=? AND status='confirmed'",
+            (turf_id, booking_date)):
+        bitmap |= slot_mask(row['start_time'], row['end_time'])
+    return bitmap
+
+
+def load_holds(conn, turf_id, booking_date):
+    """Live holds on one turf-day as (user_id, mask, expires_at) tuples."""
+    return tuple((row['user_id'], slot_mask(row['start_time'], row['end_time']), row['expires_at'])
+                 for row in conn.execute(
+                     "SELECT user_id, start_time, end_time, expires_at FROM slot_holds"
+                     " WHERE turf_id=? AND booking_date=? AND expires_at > ?",
+                     (turf_id, booking_date, time.time())))
+
+
+def iter_range(conn, turf_ids, start_date, days):
+    """Yield (turf_id, [bitmap per day]) for each turf over days starting at start_date.
+
+    One query for the whole grid, ordered to match the index so rows arrive
+    grouped by turf and only one turf's bitmaps are held at a time.
+    """
+    turf_ids = sorted(set(turf_ids))
+    end_date = start_date + timedelta(days=days - 1)
+    placeholders = ','.join('?' * len(turf_ids))
+    rows = conn.execute(f"""
+        SELECT turf_id, booking_date, start_time, end_time FROM bookings
+        WHERE turf_id IN ({placeholders}) AND booking_date BETWEEN ? AND ? AND status='confirmed'
+        ORDER BY turf_id, booking_date
+    """, (*turf_ids, start_date.isoformat(), end_date.isoformat()))
+
+    current, bitmaps = None, None
+    pending = iter(turf_ids)
+    for row in rows:
+        if row['turf_id'] != current:
+            if current is not None:
+                yield current, bitmaps
+            # Turfs with no bookings in range still get an all-free entry
+            for turf_id in pending:
+                if turf_id == row['turf_id']:
+                    break
+                yield turf_id, [0] * days
+            current, bitmaps = row['turf_id'], [0] * days
+        day = (date.fromisoformat(row['booking_date']) - start_date).days
+        bitmaps[day] |= slot_mask(row['start_time'], row['end_time'])
+    if current is not None:
+        yield current, bitmaps
+    for turf_id in pending:
+        yield turf_id, [0] * days
+
+
+def held_range(conn, turf_ids, start_date, days, user_id=None):
+    """{turf_id: [held mask per day]} for the turfs with live holds by anyone but user_id.
+
+    Holds are few and short-lived, so they are read up front in one query
+    (idx_slot_holds_slot) rather than merged into iter_range's stream.
+    """
+    turf_ids = sorted(set(turf_ids))
+    end_date = start_date + timedelta(days=days - 1)
+    placeholders = ','.join('?' * len(turf_ids))
+    held = {}
+    for row in conn.execute(f"""
+        SELECT turf_id, booking_date, start_time, end_time FROM slot_holds
+        WHERE turf_id IN ({placeholders}) AND booking_date BETWEEN ? AND ?
+        AND expires_at > ? AND user_id != ?
+    """, (*turf_ids, start_date.isoformat(), end_date.isoformat(), time.time(), -1 if user_id is None else user_id)):
+        day = (date.fromisoformat(row['booking_date']) - start_date).days
+        held.setdefault(row['turf_id'], [0] * days)[day] |= slot_mask(row['start_time'], row['end_time'])
+    return held
+
+
+class AvailabilityCache:
+    """LRU of (turf_id, date) -> (booked-slot bitmap, live holds).
+
+    Entries are patched in place by the booking/cancel write paths, so this
+    worker sees its own writes at once. The cache is per process, so every
+    entry also expires after ttl seconds; that bounds how long a booking or
+    hold made by another worker shows as free here. A hot turf-day costs
+    two indexed reads per ttl. Each entry is a small int and a handful of
+    holds, so max_entries bounds memory directly.
+    """
+
+    def __init__(self, max_entries=4096, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, turf_id, booking_date, get_conn):
+        """(booked bitmap, holds); pass holds to held_mask.
+
+        get_conn is only called on a miss, so hits never check out a connection.
+        """
+        key = (turf_id, booking_date)
+        with self._lock:
+            day = self._lookup(key)
+            if day is not None:
+                self.hits += 1
+                return day
+            self.misses += 1
+            writes = self._writes
+        conn = get_conn()
+        day = load_bitmap(conn, turf_id, booking_date), load_holds(conn, turf_id, booking_date)
+        with self._lock:
+            # A write landed while we were reading; our snapshot may be stale
+            if writes == self._writes:
+                self._store(key, day)
+        return day
+
+    def mark_booked(self, turf_id, booking_date, start_time, end_time, user_id=None):
+        """Add a booking; user_id's hold on the same slot went with it (create_booking)."""
+        key = (turf_id, booking_date)
+        mask = slot_mask(start_time, end_time)
+        with self._lock:
+            self._writes += 1
+            if key in self._entries:
+                (bitmap, holds), expires = self._entries[key]
+                holds = tuple(h for h in holds if h[0] != user_id or h[1] != mask)
+                self._entries[key] = ((bitmap | mask, holds), expires)
+
+    def refresh(self, conn, turf_id, booking_date):
+        """Reload one entry after a cancellation (slots can be shared by several bookings)."""
+        key = (turf_id, booking_date)
+        with self._lock:
+            self._writes += 1
+            writes = self._writes
+            cached = key in self._entries
+        if cached:
+            day = load_bitmap(conn, turf_id, booking_date), load_holds(conn, turf_id, booking_date)
+            with self._lock:
+                if writes == self._writes:
+                    self._store(key, day)
+                else:
+                    self._entries.pop(key, None)
+
+    def invalidate(self, turf_id=None, booking_date=None):
+        with self._lock:
+            self._writes += 1
+            if turf_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((turf_id, booking_date), None)
+
+    def _lookup(self, key):
+        """Live (bitmap, holds) or None; call with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key, day):
+        self._entries[key] = (day, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    app.extensions['availability'] = AvailabilityCache(app.config.get('AVAILABILITY_CACHE_SIZE', 4096),
+                                                       app.config.get('AVAILABILITY_TTL', TTL))
+
+
+def get_cache():
+    return current_app.extensions['availability']
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import tempfile
+
+import click
+
+from bench.seed import seed
+from bench.driver import SCENARIOS, parse_mix, run, format_report
+from bench.logins import bench_cost
+
+DEFAULT_MIX = 'search=4,slots=4,book=1,dashboard=1'
+
+
+@click.group()
+def cli():
+    """TurfBook load-test and benchmark suite."""
+
+
+@cli.command('seed')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--turfs', default=200, show_default=True)
+@click.option('--users', default=1000, show_default=True)
+@click.option('--bookings', default=20000, show_default=True)
+@click.option('--rng-seed', default=42, show_default=True)
+def seed_command(path, turfs, users, bookings, rng_seed):
+    """Create a scratch database at PATH with synthetic turfs, users and bookings."""
+    if os.path.exists(path):
+        raise click.ClickException(f'{path} already exists; seed into a new file.')
+    counts = seed(path, turfs, users, bookings, rng_seed)
+    click.echo(f"Seeded {path}: {counts['turfs']} turfs, {counts['users']} users, {counts['bookings']} bookings.")
+
+
+@cli.command('run')
+@click.option('--db', 'db_path', type=click.Path(dir_okay=False),
+              help='Seeded database; a temporary one is generated when omitted.')
+@click.option('--url', help='Drive a running server over HTTP instead of the in-process test client.')
+@click.option('--mix', default=DEFAULT_MIX, show_default=True,
+              help=f"Weighted scenarios from: {', '.join(SCENARIOS)}.")
+@click.option('--workers', default=8, show_default=True)
+@click.option('--mode', type=click.Choice(['thread', 'process']), default='thread', show_default=True)
+@click.option('--requests', default=200, show_default=True, help='Requests per worker.')
+@click.option('--duration', type=float, help='Seconds to run instead of a fixed request count.')
+@click.option('--contention-slots', default=4, show_default=True,
+              help='Slots the contention scenario fights over.')
+@click.option('--turfs', default=200, show_default=True, help='Size of a generated database.')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--bookings', default=20000, show_default=True)
+@click.option('--rate-limits/--no-rate-limits', default=False, show_default=True,
+              help='Apply per-client rate limits; every in-process worker shares one client IP.')
+@click.option('--json', 'json_out', type=click.File('w'), help='Also write the report as JSON.')
+def run_command(db_path, url, mix, workers, mode, requests, duration, contention_slots,
+                turfs, users, bookings, rate_limits, json_out):
+    """Drive the hot paths concurrently and report throughput and latency percentiles."""
+    try:
+        mix = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--mix')
+    if url and not db_path:
+        raise click.UsageError('--url needs --db pointing at the database the server uses.')
+    generate = not db_path
+    if generate:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='turfbook-bench-'), 'bench.db')
+    # Must be set before the app is first imported; its pool binds to this path
+    os.environ['TURFBOOK_DB'] = db_path = os.path.abspath(db_path)
+    os.environ['TURFBOOK_RATELIMIT'] = '1' if rate_limits else '0'
+    if generate:
+        counts = seed(db_path, turfs, users, bookings)
+        click.echo(f"Seeded {db_path}: {counts['turfs']} turfs, {counts['users']} users, {counts['bookings']} bookings.")
+    elif not url:
+        # Bring a database seeded by an older checkout up to the current schema
+        from app import init_db
+        init_db(db_path)
+
+    report = run(db_path, mix, workers, mode, requests, duration, url, contention_slots)
+    click.echo(format_report(report))
+    if json_out:
+        json.dump(report, json_out, indent=2)
+    if report['double_bookings'] or not report.get('contention_ok', True):
+        sys.exit(1)
+
+
+@cli.command('logins')
+@click.option('--costs', default='sha256,pbkdf2:200000,pbkdf2:600000,scrypt:14,scrypt:15', show_default=True,
+              help='Comma-separated cost settings to compare.')
+@click.option('--clients', default=16, show_default=True, help='Concurrent login attempts.')
+@click.option('--threads', default=4, show_default=True, help='Hasher pool size (PASSWORD_HASH_THREADS).')
+@click.option('--duration', default=3.0, show_default=True, help='Seconds per cost setting.')
+def logins_command(costs, clients, threads, duration):
+    """Report password verifications (logins) per second for each KDF cost setting."""
+    click.echo(f"{'cost':<18}{'logins':>8}{'logins/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for cost in costs.split(','):
+        try:
+            r = bench_cost(cost.strip(), clients, threads, duration)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--costs')
+        click.echo(f"{r['cost']:<18}{r['logins']:>8}{r['logins_per_s']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,279 @@
+import http.cookiejar
+import multiprocessing
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, timedelta
+
+import db
+from perf import percentile
+from bench.seed import CITIES, SPORTS, PASSWORD, FIRST_HOUR, CONTENTION_DAYS_AHEAD, user_email
+
+ADMIN = ('admin@turfbook.com', 'admin123')
+
+
+# ─── CLIENTS ──────────────────────────────────────────────────
+# Both return (status, Location header) and never follow redirects, so a
+# booking flow is measured as exactly the requests a browser would make.
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_app():
+    """One app per process, shared by its worker threads like a real server's."""
+    global _app
+    with _app_lock:
+        if _app is None:
+            from app import create_app
+            _app = create_app()
+        return _app
+
+
+class AppClient:
+    """In-process Flask test client against the app bound to TURFBOOK_DB."""
+
+    def __init__(self):
+        self.client = get_app().test_client()
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        resp.close()
+        return resp.status_code, resp.headers.get('Location', '')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """Real HTTP against a running server (python app.py, gunicorn, ...)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                resp.read()
+                return resp.status, resp.headers.get('Location', '')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get('Location', '')
+
+
+def login(client, email, password):
+    status, location = client.request('POST', '/login', {'email': email, 'password': password})
+    if status != 302 or '/login' in location:
+        raise RuntimeError(f'Login failed for {email}')
+
+
+# ─── SCENARIOS ────────────────────────────────────────────────
+# Each returns (status, outcome); outcome is 'booked'/'conflict' for bookings.
+
+def search_scenario(w):
+    city = w.rng.choice(list(CITIES))
+    query = urllib.parse.urlencode({
+        'location': w.rng.choice(CITIES[city][2]), 'sport': w.rng.choice(SPORTS),
+        'sort': w.rng.choice(['rating', 'price_asc', 'distance']), 'page': w.rng.randint(1, 3)})
+    return w.user.request('GET', f'/find-turfs?{query}')[0], None
+
+
+def slots_scenario(w):
+    day = date.today() + timedelta(days=w.rng.randint(0, 29))
+    return w.user.request('GET', f'/api/slots/{w.rng.choice(w.turf_ids)}?date={day.isoformat()}')[0], None
+
+
+def _book(w, turf_id, day, hour):
+    status, location = w.user.request('POST', f'/book/{turf_id}', {
+        'booking_date': day.isoformat(), 'start_time': f'{hour:02d}:00', 'end_time': f'{hour + 1:02d}:00',
+        'sport': 'Football', 'players': 1})
+    if status != 302 or '/confirm-booking' not in location:
+        return status, 'conflict'
+    status, location = w.user.request('POST', '/confirm-booking')
+    return status, 'booked' if '/booking-receipt/' in location else 'conflict'
+
+
+def book_scenario(w):
+    return _book(w, w.rng.choice(w.turf_ids), date.today() + timedelta(days=w.rng.randint(1, 29)),
+                 w.rng.randrange(FIRST_HOUR, 23))
+
+
+def contention_scenario(w):
+    """Every worker fights over the same few slots on one turf and day."""
+    return _book(w, w.turf_ids[0], date.today() + timedelta(days=CONTENTION_DAYS_AHEAD),
+                 FIRST_HOUR + w.rng.randrange(w.contention_slots))
+
+
+def dashboard_scenario(w):
+    return w.admin.request('GET', '/admin')[0], None
+
+
+SCENARIOS = {
+    'search': search_scenario,
+    'slots': slots_scenario,
+    'book': book_scenario,
+    'contention': contention_scenario,
+    'dashboard': dashboard_scenario,
+}
+NEEDS_USER = {'book', 'contention'}
+
+
+def parse_mix(text):
+    """'search=5,slots=5,book=1' -> {'search': 5, 'slots': 5, 'book': 1}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+# ─── WORKERS ──────────────────────────────────────────────────
+
+class Worker:
+    def __init__(self, spec):
+        self.rng = random.Random(spec['seed'])
+        self.turf_ids = spec['turf_ids']
+        self.contention_slots = spec['contention_slots']
+        new_client = (lambda: HttpClient(spec['url'])) if spec['url'] else AppClient
+        self.user = new_client()
+        self.admin = new_client()
+        if NEEDS_USER & set(spec['mix']):
+            login(self.user, user_email(spec['index'] % spec['users']), PASSWORD)
+        if 'dashboard' in spec['mix']:
+            login(self.admin, *ADMIN)
+
+
+def run_worker(spec):
+    """Run one worker's share of the load; returns raw latencies and outcomes.
+
+    Module-level so ProcessPoolExecutor can pickle it; the spec is plain data.
+    """
+    if spec['db']:
+        os.environ['TURFBOOK_DB'] = spec['db']
+    w = Worker(spec)
+    names, weights = zip(*spec['mix'].items())
+    result = {'latencies': {n: [] for n in names}, 'errors': {n: 0 for n in names},
+              'outcomes': {}}
+    deadline = time.monotonic() + spec['duration'] if spec['duration'] else None
+    done = 0
+    while time.monotonic() < deadline if deadline else done < spec['requests']:
+        done += 1
+        name = w.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            status, outcome = SCENARIOS[name](w)
+        except Exception:
+            status, outcome = 599, None
+        result['latencies'][name].append(time.perf_counter() - started)
+        if status >= 500:
+            result['errors'][name] += 1
+        if outcome:
+            key = f'{name}:{outcome}'
+            result['outcomes'][key] = result['outcomes'].get(key, 0) + 1
+    return result
+
+
+# ─── DRIVER ───────────────────────────────────────────────────
+
+def run(db_path, mix, workers=8, mode='thread', requests=200, duration=None, url=None,
+        contention_slots=4, rng_seed=1):
+    """Fan the mix out over workers threads or processes and summarize the results."""
+    conn = db.connect(db_path)
+    turf_ids = [r[0] for r in conn.execute("SELECT id FROM turfs WHERE is_active=1 ORDER BY id")]
+    users = conn.execute("SELECT COUNT(*) FROM users WHERE role='user'").fetchone()[0]
+    conn.close()
+    specs = [{
+        'index': i, 'seed': rng_seed * 1000 + i, 'db': None if url else db_path, 'url': url,
+        'mix': mix, 'requests': requests, 'duration': duration, 'turf_ids': turf_ids,
+        'users': users, 'contention_slots': contention_slots,
+    } for i in range(workers)]
+
+    if mode == 'process':
+        # spawn, so each child imports the app fresh against TURFBOOK_DB
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(workers)
+    started = time.perf_counter()
+    with pool:
+        results = list(pool.map(run_worker, specs))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed, db_path, contention_slots)
+
+
+def summarize(results, elapsed, db_path, contention_slots):
+    scenarios, outcomes = {}, {}
+    for result in results:
+        for name, latencies in result['latencies'].items():
+            entry = scenarios.setdefault(name, {'latencies': [], 'errors': 0})
+            entry['latencies'].extend(latencies)
+            entry['errors'] += result['errors'][name]
+        for key, count in result['outcomes'].items():
+            outcomes[key] = outcomes.get(key, 0) + count
+
+    rows = []
+    for name, entry in scenarios.items():
+        ordered = sorted(entry['latencies'])
+        rows.append({
+            'scenario': name,
+            'count': len(ordered),
+            'errors': entry['errors'],
+            'rps': round(len(ordered) / elapsed, 1),
+            'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        })
+    total = sum(r['count'] for r in rows)
+    report = {
+        'elapsed_s': round(elapsed, 2),
+        'requests': total,
+        'rps': round(total / elapsed, 1),
+        'scenarios': rows,
+        'outcomes': outcomes,
+        'double_bookings': double_bookings(db_path),
+    }
+    if 'contention:booked' in outcomes:
+        # Each contended slot can be won exactly once, however many workers try
+        report['contention_ok'] = outcomes['contention:booked'] <= contention_slots
+    return report
+
+
+def double_bookings(db_path):
+    """Pairs of confirmed bookings on the same turf and day whose times overlap."""
+    conn = db.connect(db_path)
+    try:
+        return [tuple(r) for r in conn.execute("""
+            SELECT a.id, b.id, a.turf_id, a.booking_date FROM bookings a
+            JOIN bookings b ON b.turf_id=a.turf_id AND b.booking_date=a.booking_date AND b.id > a.id
+            WHERE a.status='confirmed' AND b.status='confirmed'
+            AND a.start_time < b.end_time AND a.end_time > b.start_time
+        """)]
+    finally:
+        conn.close()
+
+
+def format_report(report):
+    lines = [f"{'scenario':<12}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for r in report['scenarios']:
+        lines.append(f"{r['scenario']:<12}{r['count']:>8}{r['errors']:>8}{r['rps']:>9}"
+                     f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+    lines.append(f"total {report['requests']} requests in {report['elapsed_s']}s = {report['rps']} req/s")
+    if report['outcomes']:
+        lines.append('outcomes: ' + ', '.join(f'{k}={v}' for k, v in sorted(report['outcomes'].items())))
+    lines.append(f"double bookings: {len(report['double_bookings'])}")
+    if 'contention_ok' in report:
+        lines.append(f"contention: {'ok' if report['contention_ok'] else 'FAILED - slot won more than once'}")
+    return '\n'.join(lines)
@@ -0,0 +1,60 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passwords import PasswordHasher, verify_password
+from perf import percentile
+
+
+def parse_cost(text):
+    """'scrypt:14' (log2 n; r=8, p=1), 'scrypt:14:8:2', 'pbkdf2:600000' or 'sha256' (legacy)."""
+    name, *params = text.split(':')
+    if name == 'scrypt':
+        log_n, r, p = (list(map(int, params)) + [14, 8, 1][len(params):])[:3]
+        return {'algorithm': 'scrypt', 'scrypt': (log_n, r, p)}
+    if name == 'pbkdf2':
+        return {'algorithm': 'pbkdf2_sha256', 'iterations': int(params[0]) if params else 600000}
+    if name == 'sha256':
+        return None
+    raise ValueError(f"Unknown cost '{text}'")
+
+
+def bench_cost(cost, clients=16, threads=4, duration=3.0, password='bench123'):
+    """Call PasswordHasher.check from `clients` threads for `duration` seconds.
+
+    clients > threads models a login rush: the extra callers queue on the
+    hasher's pool, so their wait shows up in the latency percentiles.
+    """
+    settings = parse_cost(cost)
+    if settings:
+        hasher = PasswordHasher(**settings, threads=threads, max_pending=clients)
+        stored, check = hasher.hash(password), hasher.check
+    else:
+        # Baseline for the old scheme: unsalted SHA-256 checked inline
+        stored = hashlib.sha256(password.encode()).hexdigest()
+        check = lambda pw, s: (verify_password(pw, s), None)
+
+    deadline = time.monotonic() + duration
+
+    def client(_):
+        latencies = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            ok, _ = check(password, stored)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                raise RuntimeError(f'{cost}: verification failed')
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = sorted(l for chunk in pool.map(client, range(clients)) for l in chunk)
+    elapsed = time.perf_counter() - started
+    return {
+        'cost': cost,
+        'logins': len(latencies),
+        'logins_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
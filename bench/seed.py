@@ -0,0 +1,76 @@
+import random
+from datetime import date, timedelta
+
+import db
+import passwords
+import search
+
+CITIES = {
+    'Bangalore': (12.97, 77.59, ['Koramangala', 'Indiranagar', 'HSR Layout', 'Whitefield', 'Jayanagar']),
+    'Delhi': (28.61, 77.21, ['Vaishali', 'Dwarka', 'Saket', 'Rohini']),
+    'Mumbai': (19.08, 72.88, ['Andheri', 'Bandra', 'Powai', 'Thane']),
+}
+SPORTS = ['Football', 'Cricket', 'Badminton', 'Tennis', 'Basketball']
+PASSWORD = 'bench123'
+FIRST_HOUR, LAST_HOUR = 6, 23
+CONTENTION_DAYS_AHEAD = 60   # the contention scenario books this far out, seeded bookings stay closer
+
+
+def user_email(n):
+    return f'user{n}@bench.test'
+
+
+def seed(path, turfs=200, users=1000, bookings=20000, rng_seed=42, batch=5000):
+    """Create a scratch database at path through init_db and fill it with synthetic data.
+
+    Everything goes through the normal INSERTs, so triggers keep the search
+    index, R*Tree, aggregates and sports table exactly as the app would.
+    """
+    import app as turfbook
+    turfbook.init_db(path)
+    rng = random.Random(rng_seed)
+    conn = db.connect(path)
+    # One hash shared by every bench user: seeding stays fast at any KDF cost
+    password = passwords.hash_password(PASSWORD)
+
+    with db.immediate(conn):
+        conn.executemany("INSERT INTO users (name,email,phone,password) VALUES (?,?,?,?)",
+                         ((f'Bench User {n}', user_email(n), f'9{n:09d}', password) for n in range(users)))
+        for n in range(turfs):
+            city = rng.choice(list(CITIES))
+            lat, lon, areas = CITIES[city]
+            sports = ','.join(rng.sample(SPORTS, rng.randint(1, 3)))
+            cur = conn.execute("""
+                INSERT INTO turfs (name,location,city,distance,rating,price_per_hour,sports,amenities,description,lat,lon)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?)
+            """, (f'Bench Turf {n}', rng.choice(areas), city, round(rng.uniform(0.5, 15), 1),
+                  round(rng.uniform(3.5, 5), 1), rng.randrange(500, 2000, 50), sports, 'Parking,Floodlight',
+                  f'Synthetic {sports.lower()} venue number {n}.',
+                  lat + rng.uniform(-0.15, 0.15), lon + rng.uniform(-0.15, 0.15)))
+            search.sync_sports(conn, cur.lastrowid, sports)
+
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users WHERE role='user'")]
+    turf_rows = conn.execute("SELECT id, price_per_hour, sports FROM turfs").fetchall()
+    today = date.today()
+    taken, rows = set(), []
+    # Cap at the number of free slots in the window so this always terminates
+    bookings = min(bookings, len(turf_rows) * 90 * (LAST_HOUR - FIRST_HOUR) // 2)
+    while len(rows) < bookings:
+        turf = rng.choice(turf_rows)
+        day = (today + timedelta(days=rng.randint(-60, 29))).isoformat()
+        hour = rng.randrange(FIRST_HOUR, LAST_HOUR)
+        if (turf['id'], day, hour) in taken:
+            continue
+        taken.add((turf['id'], day, hour))
+        status = 'cancelled' if rng.random() < 0.1 else 'confirmed'
+        rows.append((rng.choice(user_ids), turf['id'], day, f'{hour:02d}:00', f'{hour + 1:02d}:00', 1,
+                     turf['price_per_hour'], turf['sports'].split(',')[0], rng.randint(2, 12), status))
+    for i in range(0, len(rows), batch):
+        with db.immediate(conn):
+            conn.executemany("""
+                INSERT INTO bookings (user_id,turf_id,booking_date,start_time,end_time,duration_hours,total_amount,sport,players,status)
+                VALUES (?,?,?,?,?,?,?,?,?,?)
+            """, rows[i:i + batch])
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return {'turfs': len(turf_rows), 'users': len(user_ids), 'bookings': len(rows)}
@@ -0,0 +1,257 @@
+import time
+from datetime import timedelta
+
+from db import immediate
+
+
+# Error handler for database errors
+class BookingError(Exception):
+    pass
+
+
+class SlotConflict(BookingError):
+    """Raised when the requested slot overlaps a confirmed booking."""
+    pass
+
+
+# ─── TIME HELPERS ─────────────────────────────────────────────
+def parse_time(value):
+    """'HH:MM' -> minutes since midnight. '24:00' is allowed as an end time."""
+    hours, minutes = value.strip().split(':')
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= int(minutes) < 60 or not 0 <= total <= 24 * 60:
+        raise ValueError(f'Invalid time: {value}')
+    return total
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_time(value):
+    """Zero-pad times so the TEXT columns compare correctly ('9:00' -> '09:00')."""
+    return format_time(parse_time(value))
+
+
+def duration_hours(start_time, end_time):
+    """Whole hours as an int, otherwise a fraction (what bookings.duration_hours has always held)."""
+    minutes = parse_time(end_time) - parse_time(start_time)
+    return minutes // 60 if minutes % 60 == 0 else minutes / 60
+
+
+# ─── SLOT HOLDS ───────────────────────────────────────────────
+# A hold reserves a slot between book and confirm_booking. Holds expire on
+# their own (expires_at is checked by every conflict query); jobs.py deletes
+# the dead rows in the background.
+HOLD_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS slot_holds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        turf_id INTEGER NOT NULL,
+        booking_date TEXT NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_slot_holds_slot ON slot_holds(turf_id, booking_date, start_time, end_time);
+    CREATE INDEX IF NOT EXISTS idx_slot_holds_expires ON slot_holds(expires_at);
+"""
+
+HOLD_TTL = 600
+
+
+def init_schema(conn):
+    conn.executescript(HOLD_SCHEMA)
+
+
+# ─── CONFLICT CHECK ───────────────────────────────────────────
+# Served by idx_bookings_slot (turf_id, booking_date, status, start_time, end_time)
+# and idx_slot_holds_slot, so both halves are index range scans over one turf/day.
+# A user's own holds never block them.
+CONFLICT_SQL = """
+    SELECT id, 'booking' AS kind FROM bookings
+    WHERE turf_id=? AND booking_date=? AND status='confirmed'
+    AND start_time < ? AND end_time > ?
+    UNION ALL
+    SELECT id, 'hold' FROM slot_holds
+    WHERE turf_id=? AND booking_date=? AND start_time < ? AND end_time > ?
+    AND expires_at > ? AND user_id != ?
+    LIMIT 1
+"""
+
+
+def find_conflict(conn, turf_id, booking_date, start_time, end_time, user_id=None):
+    """First confirmed booking, or live hold by someone else, overlapping the slot."""
+    slot = (turf_id, booking_date, end_time, start_time)
+    return conn.execute(CONFLICT_SQL, (*slot, *slot, time.time(), -1 if user_id is None else user_id)).fetchone()
+
+
+def place_hold(conn, user_id, turf_id, booking_date, start_time, end_time, ttl=HOLD_TTL, replace=None):
+    """Hold a slot for user_id for ttl seconds. Returns (hold_id, expires_at).
+
+    replace is the user's previous hold (a new book attempt supersedes it).
+    """
+    with immediate(conn):
+        if replace:
+            conn.execute("DELETE FROM slot_holds WHERE id=? AND user_id=?", (replace, user_id))
+        if find_conflict(conn, turf_id, booking_date, start_time, end_time, user_id):
+            raise SlotConflict('Slot already booked or held')
+        expires_at = time.time() + ttl
+        cur = conn.execute("""
+            INSERT INTO slot_holds (user_id, turf_id, booking_date, start_time, end_time, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, turf_id, booking_date, start_time, end_time, expires_at))
+    return cur.lastrowid, expires_at
+
+
+def release_hold(conn, hold_id, user_id):
+    conn.execute("DELETE FROM slot_holds WHERE id=? AND user_id=?", (hold_id, user_id))
+    conn.commit()
+
+
+def expire_holds(conn):
+    """Delete holds past their TTL. Returns how many went."""
+    with immediate(conn):
+        return conn.execute("DELETE FROM slot_holds WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+def create_booking(conn, user_id, pending, on_insert=None):
+    """Check and insert in one IMMEDIATE transaction. Returns the new booking id.
+
+    Two users confirming the same slot serialize on the write lock, so the
+    second one sees the first one's row and gets SlotConflict. The user's
+    hold (pending['hold_id']) is consumed by the same transaction, as is
+    anything on_insert(conn, booking_id) writes (e.g. queued jobs).
+    """
+    with immediate(conn):
+        if find_conflict(conn, pending['turf_id'], pending['booking_date'],
+                         pending['start_time'], pending['end_time'], user_id):
+            raise SlotConflict('Slot already booked')
+        if pending.get('hold_id'):
+            conn.execute("DELETE FROM slot_holds WHERE id=? AND user_id=?", (pending['hold_id'], user_id))
+        cur = conn.execute("""
+            INSERT INTO bookings
+            (user_id, turf_id, booking_date, start_time, end_time, duration_hours, total_amount, sport, players, status, payment_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'confirmed', 'pending')
+        """, (
+            user_id,
+            pending['turf_id'],
+            pending['booking_date'],
+            pending['start_time'],
+            pending['end_time'],
+            pending['duration_hours'],
+            pending['total_amount'],
+            pending['sport'],
+            pending['players']
+        ))
+        if on_insert:
+            on_insert(conn, cur.lastrowid)
+    return cur.lastrowid
+
+
+# ─── BULK / RECURRING ─────────────────────────────────────────
+MAX_OCCURRENCES = 104   # two years of weekly slots
+
+# One statement for the whole series: each requested occurrence probes
+# idx_bookings_slot and idx_slot_holds_slot for its own turf/day, and only
+# the clashing ones come back (booking id, or NULL for someone else's hold).
+BULK_CONFLICT_SQL = """
+    WITH req(idx, booking_date, start_time, end_time) AS (VALUES {values})
+    SELECT req.idx, MIN(b.id) FROM req
+    JOIN bookings b ON b.turf_id=? AND b.booking_date=req.booking_date AND b.status='confirmed'
+        AND b.start_time < req.end_time AND b.end_time > req.start_time
+    GROUP BY req.idx
+    UNION ALL
+    SELECT DISTINCT req.idx, NULL FROM req
+    JOIN slot_holds h ON h.turf_id=? AND h.booking_date=req.booking_date
+        AND h.start_time < req.end_time AND h.end_time > req.start_time
+        AND h.expires_at > ? AND h.user_id != ?
+"""
+
+
+def expand_recurrence(first_date, count=None, until=None, every='week', interval=1):
+    """Dates every `interval` days or weeks from first_date, stopping after count or at until (inclusive)."""
+    if count is None and until is None:
+        raise BookingError('A recurrence needs a count or an until date.')
+    if every not in ('day', 'week') or interval < 1:
+        raise BookingError("Recurrence must repeat every N 'day's or 'week's.")
+    step = timedelta(days=interval * (7 if every == 'week' else 1))
+    dates, current = [], first_date
+    while (count is None or len(dates) < count) and (until is None or current <= until):
+        if len(dates) == MAX_OCCURRENCES:
+            raise BookingError(f'A series can have at most {MAX_OCCURRENCES} occurrences.')
+        dates.append(current)
+        current += step
+    return dates
+
+
+def find_conflicts(conn, turf_id, occurrences, user_id=None):
+    """{index: clashing booking id, or None for a hold} for every (date, start, end) that is taken."""
+    if not occurrences:
+        return {}
+    values = ','.join(['(?,?,?,?)'] * len(occurrences))
+    params = [v for i, occ in enumerate(occurrences) for v in (i, *occ)]
+    conflicts = {}
+    for idx, booking_id in conn.execute(BULK_CONFLICT_SQL.format(values=values),
+                                        params + [turf_id, turf_id, time.time(), -1 if user_id is None else user_id]):
+        # A confirmed booking is the more useful thing to report than a hold
+        if conflicts.get(idx) is None:
+            conflicts[idx] = booking_id
+    return conflicts
+
+
+def create_bulk_bookings(conn, user_id, turf_id, occurrences, sport, players, price_for, atomic=False,
+                         on_insert=None):
+    """Check and insert a series in one IMMEDIATE transaction.
+
+    occurrences is a list of normalized (date, start, end) and price_for(date,
+    start, end) gives each one's total_amount. Returns one result dict per
+    occurrence, in order, with status 'booked', 'conflict', or 'skipped'
+    (atomic=True and something else in the series clashed). As in
+    create_booking, on_insert(conn, booking_id) runs for every inserted row
+    inside the transaction.
+    """
+    results = [{'date': d, 'start': s, 'end': e} for d, s, e in occurrences]
+    # Occurrences that overlap an earlier one in the same request lose to it
+    clashing = set()
+    by_day = {}
+    for i, (d, s, e) in enumerate(occurrences):
+        for j in by_day.get(d, []):
+            if occurrences[j][1] < e and occurrences[j][2] > s:
+                clashing.add(i)
+                results[i].update(status='conflict', conflict_with=None, reason='Overlaps another occurrence in this request')
+                break
+        else:
+            by_day.setdefault(d, []).append(i)
+
+    with immediate(conn):
+        for i, booking_id in find_conflicts(conn, turf_id, occurrences, user_id).items():
+            if i not in clashing:
+                clashing.add(i)
+                results[i].update(status='conflict', conflict_with=booking_id,
+                                  reason='Slot already booked' if booking_id else 'Slot is on hold for another user')
+        accepted = [i for i in range(len(occurrences)) if i not in clashing]
+        if atomic and clashing:
+            for i in accepted:
+                results[i].update(status='skipped')
+            return results
+        if accepted:
+            rows = []
+            for i in accepted:
+                d, s, e = occurrences[i]
+                duration = duration_hours(s, e)
+                rows.append((user_id, turf_id, d, s, e, duration, price_for(d, s, e), sport, players))
+            # Accepted occurrences never overlap, so (date, start) identifies each returned row
+            inserted = conn.execute(f"""
+                INSERT INTO bookings
+                (user_id, turf_id, booking_date, start_time, end_time, duration_hours, total_amount, sport, players, status, payment_status)
+                VALUES {','.join(["(?,?,?,?,?,?,?,?,?,'confirmed','pending')"] * len(rows))}
+                RETURNING id, booking_date, start_time, total_amount
+            """, [v for row in rows for v in row]).fetchall()
+            ids = {(r[1], r[2]): (r[0], r[3]) for r in inserted}
+            for i in accepted:
+                booking_id, amount = ids[occurrences[i][:2]]
+                results[i].update(status='booked', booking_id=booking_id, amount=amount)
+                if on_insert:
+                    on_insert(conn, booking_id)
+    return results
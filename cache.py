@@ -0,0 +1,171 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+SHARED_TTL = 300          # CACHE_URL: every worker sees bump(), so entries can live long
+LOCAL_TTL = 5             # per-worker caches: how long another worker's edit can go unseen
+
+
+# ─── BACKENDS ─────────────────────────────────────────────────
+
+class CacheBackend:
+    """Minimal interface the catalog cache needs. Values must be picklable
+    (plain dicts/lists/str) so a shared backend can hold them."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        """Atomically add 1 to a counter and return the new value (missing counters start at 0)."""
+        raise NotImplementedError
+
+    def counter(self, key):
+        """Current value of a counter; counters are never evicted."""
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    """In-process TTL + LRU store. Per worker, so also the stand-in for tests."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+
+class RedisCache(CacheBackend):
+    """Shared across workers and hosts. Needs the optional `redis` package."""
+
+    def __init__(self, url, prefix='turfbook:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('CACHE_URL is set but the redis package is not installed.')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+
+# ─── CATALOG CACHE ────────────────────────────────────────────
+
+class CatalogCache:
+    """Read-through cache for turf rows and rendered fragments.
+
+    Every key is namespaced by a generation counter stored in the backend.
+    Writes to the catalog call bump(), which moves every reader of that
+    backend to a fresh namespace at once; stale entries simply age out of
+    the LRU/TTL. Only a shared backend (CACHE_URL) shares the counter: with
+    per-worker LocalCaches, other workers notice an edit only when their
+    entries expire, so init_app gives those a short ttl.
+    """
+
+    GENERATION_KEY = 'catalog:generation'
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self):
+        return self.backend.counter(self.GENERATION_KEY)
+
+    def get_or_load(self, name, loader, ttl=None):
+        key = f'catalog:{self.generation()}:{name}'
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+    def bump(self):
+        return self.backend.incr(self.GENERATION_KEY)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'generation': self.generation(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    if app.config.get('CACHE_URL'):
+        backend = RedisCache(app.config['CACHE_URL'])
+        ttl = app.config.get('CACHE_TTL', SHARED_TTL)
+    else:
+        backend = LocalCache(app.config.get('CACHE_SIZE', 1024))
+        ttl = app.config.get('CACHE_LOCAL_TTL', LOCAL_TTL)
+    app.extensions['catalog'] = CatalogCache(backend, ttl=ttl)
+
+
+def get_catalog():
+    return current_app.extensions['catalog']
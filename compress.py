@@ -0,0 +1,67 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIMETYPES = {'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+             'application/javascript', 'image/svg+xml'}
+MIN_SIZE = 1024           # smaller bodies are not worth the CPU or the headers
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5        # dynamic responses; build-time assets use 11
+
+
+def choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, GZIP_LEVEL if level is None else level)
+
+
+class Compressor:
+    """after_request hook compressing buffered HTML/JSON/text responses.
+
+    Streams (exports, NDJSON), files (static and fingerprinted assets, which
+    are precompressed at build time) and anything already encoded pass
+    through untouched. A strong ETag becomes weak once the body is
+    re-encoded, so If-None-Match keeps matching across encodings.
+    """
+
+    def __init__(self, min_size=MIN_SIZE, level=None):
+        self.min_size = min_size
+        self.level = level
+
+    def __call__(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None or response.content_length is not None and response.content_length < self.min_size:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.set_data(compress(data, encoding, self.level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.after_request(Compressor(app.config.get('COMPRESS_MIN_SIZE', MIN_SIZE),
+                                    app.config.get('COMPRESS_LEVEL')))
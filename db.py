@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from flask import g, current_app
+
+# Pragmas applied to every new connection. journal_mode=WAL is persistent in the
+# database file, the rest are per-connection.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,       # ~16 MB page cache per connection
+    'mmap_size': 134217728,     # 128 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+
+def connect(path, pragmas=None, timeout=10.0, factory=sqlite3.Connection):
+    """Open a tuned SQLite connection. Used by the pool and by one-off scripts."""
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, factory=factory)
+    conn.row_factory = sqlite3.Row
+    for name, value in (pragmas or DEFAULT_PRAGMAS).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def add_column(conn, table, column, decl):
+    """Add a column to an existing table if it is missing (schema migrations)."""
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+class ConnectionPool:
+    """Keeps idle connections around so requests don't pay the connect cost.
+
+    Connections are handed out LIFO, so a worker thread that keeps serving
+    requests keeps getting the same warm connection back.
+    """
+
+    def __init__(self, path, max_idle=16, pragmas=None, factory=sqlite3.Connection):
+        self.path = path
+        self.max_idle = max_idle
+        self.pragmas = pragmas
+        self.factory = factory
+        self._idle = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+            self.misses += 1
+        return connect(self.path, self.pragmas, factory=self.factory)
+
+    def release(self, conn):
+        # Never hand a connection with an open transaction to the next request
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self.discarded += 1
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'discarded': self.discarded,
+                'idle': len(self._idle),
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    factory = sqlite3.Connection
+    if app.config.get('PERF_ENABLED'):
+        from perf import InstrumentedConnection
+        factory = InstrumentedConnection
+    app.extensions['db_pool'] = ConnectionPool(
+        app.config['DATABASE'], max_idle=app.config.get('DB_POOL_SIZE', 16), factory=factory)
+    app.teardown_appcontext(close_db)
+
+
+def get_pool():
+    return current_app.extensions['db_pool']
+
+
+def get_db():
+    """Connection bound to the current app context, returned to the pool on teardown."""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+@contextmanager
+def immediate(conn):
+    """Run a block under BEGIN IMMEDIATE so the write lock is taken up front.
+
+    Readers keep going under WAL, but a second writer waits on busy_timeout
+    instead of racing us between our SELECT and INSERT.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
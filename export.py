@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import zlib
+
+BATCH_SIZE = 1000
+
+# kind -> (select, date column for range filters, trailing clause)
+EXPORTS = {
+    'bookings': ("""
+        SELECT b.id, b.booking_date, b.start_time, b.end_time, b.duration_hours, b.total_amount,
+               b.sport, b.players, b.status, b.payment_status, b.created_at,
+               b.user_id, u.name AS user_name, u.email AS user_email, b.turf_id, t.name AS turf_name
+        FROM all_bookings b JOIN users u ON b.user_id=u.id JOIN turfs t ON b.turf_id=t.id
+    """, 'b.booking_date', 'ORDER BY b.id'),
+    'revenue': ("""
+        SELECT b.booking_date, b.turf_id, t.name AS turf_name,
+               COUNT(*) AS bookings, SUM(b.total_amount) AS revenue, SUM(b.duration_hours) AS hours
+        FROM all_bookings b JOIN turfs t ON b.turf_id=t.id
+        WHERE b.status='confirmed'
+    """, 'b.booking_date', 'GROUP BY b.booking_date, b.turf_id ORDER BY b.booking_date, b.turf_id'),
+    'users': ("""
+        SELECT id, name, email, phone, role, created_at FROM users
+    """, 'created_at', 'ORDER BY id'),
+    'turfs': ("""
+        SELECT id, name, location, city, lat, lon, price_per_hour, sports, amenities,
+               open_time, close_time, max_players, rating, review_count, is_active
+        FROM turfs
+    """, None, 'ORDER BY id'),
+}
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def iter_rows(conn, kind, date_from=None, date_to=None, batch=BATCH_SIZE):
+    """Yield the column names, then row tuples, pulling batch rows at a time."""
+    select, date_col, tail = EXPORTS[kind]
+    clauses, params = [], []
+    if date_col and date_from:
+        clauses.append(f"{date_col} >= ?")
+        params.append(date_from)
+    if date_col and date_to:
+        # created_at carries a time part, so compare on the day boundary
+        clauses.append(f"{date_col} < date(?, '+1 day')")
+        params.append(date_to)
+    sql = select
+    if clauses:
+        sql += (' AND ' if 'WHERE' in select else ' WHERE ') + ' AND '.join(clauses)
+    cur = conn.execute(f"{sql} {tail}", params)
+    yield [d[0] for d in cur.description]
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return
+        yield from (tuple(r) for r in rows)
+
+
+def csv_chunks(rows, batch=BATCH_SIZE):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % batch == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def ndjson_chunks(rows, batch=BATCH_SIZE):
+    rows = iter(rows)
+    columns = next(rows)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), separators=(',', ':')))
+        if len(lines) == batch:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a text stream on the fly into a single gzip member."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk.encode())
+        if data:
+            yield data
+    yield z.flush()
+
+
+def stream(conn, kind, fmt='csv', date_from=None, date_to=None, gzip=False):
+    """Chunks (str, or bytes when gzip) of a full export; memory use is one batch."""
+    rows = iter_rows(conn, kind, date_from, date_to)
+    chunks = csv_chunks(rows) if fmt == 'csv' else ndjson_chunks(rows)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,88 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+MAX_RADIUS_KM = 100
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# turfs_geo is an R*Tree over turf coordinates (a point is a zero-size box),
+# maintained by triggers so admin writes never have to think about it.
+SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS turfs_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+
+    CREATE TRIGGER IF NOT EXISTS turfs_geo_ai AFTER INSERT ON turfs
+    WHEN new.lat IS NOT NULL AND new.lon IS NOT NULL BEGIN
+        INSERT INTO turfs_geo VALUES (new.id, new.lat, new.lat, new.lon, new.lon);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS turfs_geo_au AFTER UPDATE OF lat, lon ON turfs BEGIN
+        DELETE FROM turfs_geo WHERE id=old.id;
+        INSERT INTO turfs_geo SELECT new.id, new.lat, new.lat, new.lon, new.lon
+        WHERE new.lat IS NOT NULL AND new.lon IS NOT NULL;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS turfs_geo_ad AFTER DELETE ON turfs BEGIN
+        DELETE FROM turfs_geo WHERE id=old.id;
+    END;
+'''
+
+
+def init_schema(conn):
+    fresh = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='turfs_geo'").fetchone()
+    conn.executescript(SCHEMA)
+    if fresh:
+        conn.execute("""
+            INSERT INTO turfs_geo SELECT id, lat, lat, lon, lon FROM turfs
+            WHERE lat IS NOT NULL AND lon IS NOT NULL
+        """)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing the circle; used to probe the R*Tree."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+BOX_SQL = "id IN (SELECT id FROM turfs_geo WHERE max_lat>=? AND min_lat<=? AND max_lon>=? AND min_lon<=?)"
+
+
+def within(rows, lat, lon, radius_km):
+    """Attach real distances to candidate rows and drop those outside the circle.
+
+    Returns dicts (sqlite3.Row is read-only) with distance set to the rounded
+    distance from (lat, lon), in the rows' original order.
+    """
+    result = []
+    for row in rows:
+        d = haversine_km(lat, lon, row['lat'], row['lon'])
+        if d <= radius_km:
+            item = dict(row)
+            item['distance'] = round(d, 1)
+            result.append(item)
+    return result
+
+
+def nearest(conn, lat, lon, k=10, radius_km=None):
+    """k nearest active turfs, closest first.
+
+    Without a radius the search box starts small and doubles until it holds k
+    turfs, so dense cities stay cheap and sparse areas still get answers.
+    """
+    radius = radius_km or 2.0
+    while True:
+        box = bounding_box(lat, lon, radius)
+        rows = conn.execute(f"SELECT * FROM turfs WHERE is_active=1 AND {BOX_SQL}", box).fetchall()
+        found = within(rows, lat, lon, radius)
+        if radius_km or len(found) >= k or radius >= MAX_RADIUS_KM:
+            break
+        radius = min(radius * 2, MAX_RADIUS_KM)
+    found.sort(key=lambda t: t['distance'])
+    return found[:k]
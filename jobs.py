@@ -0,0 +1,255 @@
+import json
+import logging
+import threading
+import time
+from flask import current_app
+
+import booking
+import db
+import sessions
+
+log = logging.getLogger(__name__)
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# The queue lives in SQLite so queued work survives a restart. Jobs are
+# claimed with a single UPDATE ... RETURNING, so workers in several
+# processes can share the table. Finished jobs are deleted; failed ones
+# stay behind for inspection.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_at REAL NOT NULL,
+        locked_until REAL,
+        last_error TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs(status, run_at);
+
+    CREATE TABLE IF NOT EXISTS receipts (
+        booking_id INTEGER PRIMARY KEY,
+        body TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 300       # a running job not finished by then is assumed dead and requeued
+SWEEP_SECONDS = 30        # how often expired holds, sessions and dead jobs are cleaned up
+
+HANDLERS = {}
+
+
+class RetryLater(Exception):
+    """Raised by a handler that could not finish yet; the job is retried with backoff."""
+    pass
+
+
+def handler(kind):
+    """Register fn(conn, payload) as the handler for jobs of this kind."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def enqueue(conn, kind, payload=None, delay=0):
+    """Add a job on conn without committing, so it can share the caller's transaction."""
+    if kind not in HANDLERS:
+        raise ValueError(f'No handler for job kind {kind}')
+    return conn.execute("INSERT INTO jobs (kind, payload, run_at) VALUES (?, ?, ?)",
+                        (kind, json.dumps(payload or {}), time.time() + delay)).lastrowid
+
+
+# ─── WORKERS ──────────────────────────────────────────────────
+
+class JobQueue:
+    """Worker threads draining the jobs table, plus the periodic hold sweep.
+
+    Threads start lazily on the first request (see init_app), so CLI
+    commands and scripts that build an app don't spin up workers.
+    """
+
+    def __init__(self, app, threads=2, poll_interval=1.0):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._next_sweep = 0.0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def started(self):
+        return bool(self._workers)
+
+    def start(self):
+        with self._lock:
+            if self._workers or not self.threads:
+                return
+            for i in range(self.threads):
+                worker = threading.Thread(target=self._run, name=f'jobs-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def notify(self):
+        """Wake a worker now instead of at the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        pool = self.app.extensions['db_pool']
+        while not self._stop.is_set():
+            conn = pool.acquire()
+            try:
+                with self.app.app_context():
+                    self._maybe_sweep(conn)
+                    ran = self.run_pending(conn)
+            except Exception:
+                log.exception('Job worker error')
+                ran = False
+            finally:
+                pool.release(conn)
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _maybe_sweep(self, conn):
+        with self._lock:
+            if time.time() < self._next_sweep:
+                return
+            self._next_sweep = time.time() + SWEEP_SECONDS
+        sweep(conn)
+
+    def run_pending(self, conn, limit=50):
+        """Claim and run up to limit due jobs on conn. Returns how many ran."""
+        ran = 0
+        while ran < limit:
+            with db.immediate(conn):
+                job = conn.execute("""
+                    UPDATE jobs SET status='running', attempts=attempts+1, locked_until=?
+                    WHERE id=(SELECT id FROM jobs WHERE status='queued' AND run_at<=? ORDER BY run_at LIMIT 1)
+                    RETURNING id, kind, payload, attempts
+                """, (time.time() + LEASE_SECONDS, time.time())).fetchone()
+            if job is None:
+                return ran
+            self._execute(conn, job)
+            ran += 1
+        return ran
+
+    def _execute(self, conn, job):
+        try:
+            HANDLERS[job['kind']](conn, json.loads(job['payload']))
+            conn.execute("DELETE FROM jobs WHERE id=?", (job['id'],))
+            conn.commit()
+            with self._lock:
+                self.processed += 1
+        except Exception as e:
+            conn.rollback()
+            retry = job['attempts'] < MAX_ATTEMPTS
+            if not isinstance(e, RetryLater):
+                log.exception('Job %s (%s) failed', job['id'], job['kind'])
+            conn.execute("UPDATE jobs SET status=?, run_at=?, locked_until=NULL, last_error=? WHERE id=?", (
+                'queued' if retry else 'failed', time.time() + 5 * 2 ** job['attempts'], str(e)[:500], job['id']))
+            conn.commit()
+            if not retry:
+                with self._lock:
+                    self.failed += 1
+
+    def stats(self, conn):
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        with self._lock:
+            return {'workers': len(self._workers), 'processed': self.processed, 'failed': self.failed,
+                    'queued': counts.get('queued', 0), 'running': counts.get('running', 0),
+                    'dead': counts.get('failed', 0)}
+
+
+def sweep(conn):
+    """Drop expired slot holds and sessions, and requeue jobs whose worker died mid-run."""
+    expired = booking.expire_holds(conn)
+    sessions.expire_sessions(conn)
+    with db.immediate(conn):
+        requeued = conn.execute("""
+            UPDATE jobs SET status='queued', locked_until=NULL
+            WHERE status='running' AND locked_until < ?
+        """, (time.time(),)).rowcount
+    return expired, requeued
+
+
+# ─── HANDLERS ─────────────────────────────────────────────────
+
+@handler('send_receipt')
+def send_receipt(conn, payload):
+    """Render the plain-text receipt for a booking and store it."""
+    b = conn.execute("""
+        SELECT b.*, t.name AS turf_name, t.location, u.name AS user_name, u.email
+        FROM bookings b JOIN turfs t ON b.turf_id=t.id JOIN users u ON b.user_id=u.id
+        WHERE b.id=?
+    """, (payload['booking_id'],)).fetchone()
+    if b is None:
+        return
+    body = '\n'.join([
+        f"TurfBook receipt #{b['id']}",
+        f"{b['user_name']} <{b['email']}>",
+        f"{b['turf_name']}, {b['location']}",
+        f"{b['booking_date']} {b['start_time']}-{b['end_time']} ({b['duration_hours']} h, {b['sport']}, {b['players']} players)",
+        f"Amount: Rs {b['total_amount']}  Payment: {b['payment_status']}  Status: {b['status']}",
+    ])
+    conn.execute("INSERT OR REPLACE INTO receipts (booking_id, body) VALUES (?, ?)", (b['id'], body))
+    sender = current_app.config.get('RECEIPT_SENDER')
+    if sender:
+        sender(b['email'], f"TurfBook booking #{b['id']}", body)
+
+
+@handler('reconcile_payment')
+def reconcile_payment(conn, payload):
+    """Ask the configured gateway for the booking's payment state and record it.
+
+    PAYMENT_STATUS_LOOKUP(booking_row) returns the new payment_status, or
+    None if the gateway has no answer yet (the job is retried with backoff).
+    Without a gateway configured there is nothing to reconcile.
+    """
+    lookup = current_app.config.get('PAYMENT_STATUS_LOOKUP')
+    if lookup is None:
+        return
+    b = conn.execute("SELECT * FROM bookings WHERE id=?", (payload['booking_id'],)).fetchone()
+    if b is None:
+        return
+    status = lookup(b)
+    if status is None:
+        raise RetryLater('Payment status not available yet')
+    if status != b['payment_status']:
+        conn.execute("UPDATE bookings SET payment_status=? WHERE id=?", (status, b['id']))
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    queue = JobQueue(app, threads=app.config.get('JOB_WORKERS', 2),
+                     poll_interval=app.config.get('JOB_POLL_INTERVAL', 1.0))
+    app.extensions['jobs'] = queue
+
+    @app.before_request
+    def _start_workers():
+        if not queue.started:
+            queue.start()
+
+
+def get_queue():
+    return current_app.extensions['jobs']
@@ -0,0 +1,69 @@
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, keys=None):
+    """Opaque cursor -> list of key values, or None if missing/garbled.
+
+    Cursors come straight from the query string, so anything that could not
+    have been produced by encode_cursor for these keys (wrong length, or
+    values SQLite cannot bind) is treated as garbled: the first page.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or keys is not None and len(values) != len(keys):
+        return None
+    if not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+def _query(select, where, params, keys, cursor):
+    where, params = list(where), list(params)
+    exprs = [expr for expr, _ in keys]
+    if cursor is not None and len(cursor) == len(keys):
+        # Row-value comparison lets SQLite seek straight into the (k1, k2, ...) index
+        where.append(f"({', '.join(exprs)}) < ({', '.join('?' * len(keys))})")
+        params += cursor
+    sql = select
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY ' + ', '.join(f'{e} DESC' for e in exprs)
+    return sql, params
+
+
+def keyset_page(conn, select, where, params, keys, cursor=None, limit=DEFAULT_LIMIT):
+    """One page of a newest-first listing. Returns (rows, next_cursor).
+
+    keys is a list of (sql_expr, row_column) pairs forming a unique sort key,
+    e.g. [('b.booking_date', 'booking_date'), ('b.id', 'id')]. Cost is one
+    index seek plus `limit` rows, however deep the page.
+    """
+    sql, params = _query(select, where, params, keys, cursor)
+    rows = conn.execute(sql + ' LIMIT ?', params + [limit + 1]).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1][col] for _, col in keys])
+
+
+def iter_rows(conn, select, where, params, keys, cursor=None, batch=500):
+    """Every matching row from cursor onwards, fetched in batches so memory stays flat."""
+    sql, params = _query(select, where, params, keys, cursor)
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return
+        yield from rows
@@ -0,0 +1,153 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+# Stored formats:
+#   scrypt$<log2 n>$<r>$<p>$<salt>$<hash>
+#   pbkdf2_sha256$<iterations>$<salt>$<hash>
+#   64 hex chars: legacy unsalted SHA-256, upgraded on the next successful login
+ALGORITHMS = ('scrypt', 'pbkdf2_sha256')
+DEFAULT_SCRYPT = (14, 8, 1)          # n=16384, r=8, p=1: ~16 MB and tens of ms per hash
+DEFAULT_PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+
+
+class PasswordHasherBusy(Exception):
+    """More verifications are queued than the pool will accept; retry later."""
+    pass
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p, dklen=32)
+
+
+def hash_password(password, algorithm='scrypt', scrypt=DEFAULT_SCRYPT, iterations=DEFAULT_PBKDF2_ITERATIONS):
+    salt = os.urandom(SALT_BYTES)
+    if algorithm == 'scrypt':
+        log_n, r, p = scrypt
+        return f'scrypt${log_n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, log_n, r, p))}'
+    if algorithm == 'pbkdf2_sha256':
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+        return f'pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}'
+    raise ValueError(f'Unknown password algorithm: {algorithm}')
+
+
+def verify_password(password, stored):
+    """Constant-time check of password against any stored format.
+
+    A hash that cannot be parsed (unknown format, bad base64, cost settings
+    hashlib refuses) never matches; it is a failed login, not an error.
+    """
+    parts = stored.split('$')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            log_n, r, p = (int(x) for x in parts[1:4])
+            computed = _scrypt(password, _unb64(parts[4]), log_n, r, p)
+        elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            computed = hashlib.pbkdf2_hmac('sha256', password.encode(), _unb64(parts[2]), int(parts[1]))
+        elif len(stored) == 64:
+            return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        else:
+            return False
+        return hmac.compare_digest(computed, _unb64(parts[-1]))
+    except (ValueError, TypeError, OverflowError):
+        return False
+
+
+class PasswordHasher:
+    """Hashes and verifies with the configured KDF on a bounded thread pool.
+
+    A KDF is deliberately slow, so a burst of logins would otherwise occupy
+    every request thread at once. Here at most `threads` hashes run at a
+    time and at most `max_pending` wait; past that check() raises
+    PasswordHasherBusy instead of letting the queue grow without bound.
+    """
+
+    def __init__(self, algorithm='scrypt', scrypt=DEFAULT_SCRYPT, iterations=DEFAULT_PBKDF2_ITERATIONS,
+                 threads=4, max_pending=64, timeout=5.0):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unknown password algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.scrypt = tuple(scrypt)
+        self.iterations = iterations
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='passwords')
+        self._slots = threading.BoundedSemaphore(threads + max_pending)
+        self._dummy = None
+
+    def hash(self, password):
+        return hash_password(password, self.algorithm, self.scrypt, self.iterations)
+
+    def needs_rehash(self, stored):
+        """True for legacy hashes and hashes made with other cost settings."""
+        if self.algorithm == 'scrypt':
+            return not stored.startswith('scrypt$%d$%d$%d$' % self.scrypt)
+        return not stored.startswith(f'pbkdf2_sha256${self.iterations}$')
+
+    def _verify_dummy(self, password):
+        if self._dummy is None:
+            self._dummy = self.hash(os.urandom(SALT_BYTES).hex())
+        verify_password(password, self._dummy)
+        return False, None
+
+    def _verify_and_upgrade(self, password, stored):
+        if not verify_password(password, stored):
+            return False, None
+        return True, self.hash(password) if self.needs_rehash(stored) else None
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def check(self, password, stored):
+        """(ok, new_hash): new_hash is set when the stored hash should be replaced."""
+        return self._submit(self._verify_and_upgrade, password, stored)
+
+    def reject(self, password):
+        """check() for an unknown account: the same KDF work, always (False, None).
+
+        Without it a login for an email that does not exist answers before
+        any hashing, and the difference in timing tells who has an account.
+        """
+        return self._submit(self._verify_dummy, password)
+
+    def make(self, password):
+        """hash() on the pool, for request handlers (registration)."""
+        return self._submit(self.hash, password)
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    app.extensions['passwords'] = PasswordHasher(
+        algorithm=app.config.get('PASSWORD_ALGORITHM', 'scrypt'),
+        scrypt=app.config.get('PASSWORD_SCRYPT', DEFAULT_SCRYPT),
+        iterations=app.config.get('PASSWORD_PBKDF2_ITERATIONS', DEFAULT_PBKDF2_ITERATIONS),
+        threads=app.config.get('PASSWORD_HASH_THREADS', 4),
+        max_pending=app.config.get('PASSWORD_HASH_QUEUE', 64),
+    )
+
+
+def get_hasher():
+    return current_app.extensions['passwords']
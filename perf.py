@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from flask import g, request, has_app_context, current_app, before_render_template, template_rendered
+
+WINDOW = 1000           # requests kept per endpoint for percentiles
+SLOW_QUERY_MS = 50      # statements slower than this go to the slow log
+TOP_STATEMENTS = 3      # slowest statements reported per request
+UNMATCHED = '<unmatched>'  # one bucket for 404s, so scanned URLs cannot grow the registry
+
+
+# ─── SQL TIMING ───────────────────────────────────────────────
+
+def _record(sql, started):
+    if has_app_context():
+        stats = g.get('perf')
+        if stats is not None:
+            stats.add_query(sql, time.perf_counter() - started)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that times every statement into the current request's stats.
+
+    Only used when PERF_ENABLED is on; otherwise the pool hands out plain
+    connections and there is nothing in the query path at all.
+    """
+
+    def execute(self, sql, *args):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            _record(sql, started)
+
+    def executemany(self, sql, *args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            _record(sql, started)
+
+    def executescript(self, sql):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql)
+        finally:
+            _record(sql, started)
+
+
+# ─── PER-REQUEST STATS ────────────────────────────────────────
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.statements = []
+        self.template_time = 0.0
+        self._template_stack = []
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.sql_time += seconds
+        self.statements.append((seconds, ' '.join(sql.split())))
+
+    def slowest(self, n=TOP_STATEMENTS):
+        return sorted(self.statements, reverse=True)[:n]
+
+
+class PerfRegistry:
+    """Rolling per-endpoint latency windows plus a slow-statement log."""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._queries = defaultdict(lambda: deque(maxlen=window))
+        self._sql = defaultdict(lambda: deque(maxlen=window))
+        self.slow_queries = deque(maxlen=50)
+
+    def add(self, endpoint, total, stats):
+        with self._lock:
+            self._durations[endpoint].append(total)
+            self._queries[endpoint].append(stats.query_count)
+            self._sql[endpoint].append(stats.sql_time)
+            for seconds, sql in stats.slowest():
+                if seconds * 1000 >= SLOW_QUERY_MS:
+                    self.slow_queries.appendleft((endpoint, round(seconds * 1000, 2), sql))
+
+    def summary(self):
+        rows = []
+        with self._lock:
+            for endpoint, durations in self._durations.items():
+                ordered = sorted(durations)
+                queries, sql = self._queries[endpoint], self._sql[endpoint]
+                rows.append({
+                    'endpoint': endpoint,
+                    'count': len(ordered),
+                    'p50': percentile(ordered, 50) * 1000,
+                    'p95': percentile(ordered, 95) * 1000,
+                    'p99': percentile(ordered, 99) * 1000,
+                    'avg_queries': sum(queries) / len(queries),
+                    'avg_sql_ms': sum(sql) / len(sql) * 1000,
+                })
+        return sorted(rows, key=lambda r: r['p95'], reverse=True)
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def _before_request():
+    g.perf = RequestStats()
+
+
+def _after_request(response):
+    stats = g.pop('perf', None)
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.started
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.query_count} queries"',
+        f'tpl;dur={stats.template_time * 1000:.2f}',
+        f'app;dur={total * 1000:.2f}',
+    ])
+    current_app.extensions['perf'].add(request.endpoint or UNMATCHED, total, stats)
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    stats = g.get('perf')
+    if stats is not None:
+        stats._template_stack.append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = g.get('perf')
+    if stats is not None and stats._template_stack:
+        started = stats._template_stack.pop()
+        # Nested renders (cached fragments) are already inside the outer one
+        if not stats._template_stack:
+            stats.template_time += time.perf_counter() - started
+
+
+def init_app(app):
+    app.extensions['perf'] = PerfRegistry()
+    if not app.config.get('PERF_ENABLED'):
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+
+def get_registry():
+    return current_app.extensions['perf']
@@ -0,0 +1,166 @@
+import threading
+from datetime import date, timedelta
+from flask import current_app
+
+from booking import parse_time
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# Rules adjust turfs.price_per_hour for a set of weekdays (Monday=0) and an
+# hour range. turf_id NULL applies to every turf. Rules are applied in
+# (priority, id) order, each either replacing the hourly price (flat) or
+# scaling it (multiplier). A rule with min_demand only applies to the hours
+# whose recent occupancy is at least that fraction.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS pricing_rules (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        turf_id INTEGER,
+        name TEXT NOT NULL DEFAULT '',
+        days TEXT NOT NULL DEFAULT '0123456',
+        start_hour INTEGER NOT NULL DEFAULT 0,
+        end_hour INTEGER NOT NULL DEFAULT 24,
+        multiplier REAL NOT NULL DEFAULT 1.0,
+        flat INTEGER,
+        min_demand REAL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(turf_id) REFERENCES turfs(id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_pricing_rules_turf ON pricing_rules(turf_id);
+'''
+
+DAYS, HOURS = 7, 24
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+DEMAND_WEEKS = 8          # occupancy window for min_demand rules
+DEMAND_TTL = 3600         # grids with demand rules are recompiled hourly; others only on change
+LOCAL_TTL = 30            # without CACHE_URL, how long other workers may quote superseded prices
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def rule_hours(rule):
+    """Hours a rule covers; start > end wraps past midnight (22-2 is 22, 23, 0, 1)."""
+    start, end = rule['start_hour'], rule['end_hour']
+    return list(range(start, end)) if start < end else list(range(start, HOURS)) + list(range(0, end))
+
+
+def demand(conn, turf_id, weeks=DEMAND_WEEKS):
+    """Fraction of the last `weeks` weeks each weekday x hour was booked."""
+    counts = [[0] * HOURS for _ in range(DAYS)]
+    since = (date.today() - timedelta(weeks=weeks)).isoformat()
+    for row in conn.execute("""
+        SELECT booking_date, start_time, end_time FROM all_bookings
+        WHERE turf_id=? AND status='confirmed' AND booking_date >= ? AND booking_date < ?
+    """, (turf_id, since, date.today().isoformat())):
+        day = date.fromisoformat(row['booking_date']).weekday()
+        for hour in range(parse_time(row['start_time']) // 60, -(-parse_time(row['end_time']) // 60)):
+            counts[day][hour] += 1
+    return [[n / weeks for n in row] for row in counts]
+
+
+def compile_grid(base_price, rules, occupancy=None):
+    """Apply rules to a flat base price. Returns 7 rows (Mon..Sun) of 24 hourly prices."""
+    grid = [[float(base_price)] * HOURS for _ in range(DAYS)]
+    for rule in rules:
+        for day in (int(d) for d in rule['days']):
+            for hour in rule_hours(rule):
+                if rule['min_demand'] is not None and (occupancy is None or occupancy[day][hour] < rule['min_demand']):
+                    continue
+                grid[day][hour] = rule['flat'] if rule['flat'] is not None else grid[day][hour] * rule['multiplier']
+    return [[round(p) for p in row] for row in grid]
+
+
+def load_rules(conn, turf_id):
+    return conn.execute("""
+        SELECT * FROM pricing_rules WHERE turf_id=? OR turf_id IS NULL ORDER BY priority, id
+    """, (turf_id,)).fetchall()
+
+
+def build_grid(conn, turf_id):
+    """(grid, uses_demand) for one turf, or (None, False) if it does not exist."""
+    turf = conn.execute("SELECT price_per_hour FROM turfs WHERE id=?", (turf_id,)).fetchone()
+    if turf is None:
+        return None, False
+    rules = load_rules(conn, turf_id)
+    uses_demand = any(r['min_demand'] is not None for r in rules)
+    return compile_grid(turf['price_per_hour'], rules, demand(conn, turf_id) if uses_demand else None), uses_demand
+
+
+def quote(grid, booking_date, start_time, end_time):
+    """Price of [start, end) on booking_date; partial hours are charged pro rata."""
+    row = grid[date.fromisoformat(booking_date).weekday()]
+    minute, end = parse_time(start_time), parse_time(end_time)
+    total = 0.0
+    while minute < end:
+        hour = minute // 60
+        step = min(end, (hour + 1) * 60) - minute
+        total += row[hour] * step / 60
+        minute += step
+    return round(total)
+
+
+# ─── GRID CACHE ───────────────────────────────────────────────
+
+class PriceGrids:
+    """Compiled grids kept in the catalog cache backend.
+
+    Keys carry a pricing generation; changing any rule (or a base price)
+    calls invalidate(), so grids are rebuilt only after a change. The
+    generation lives in the backend, so with a per-worker backend only the
+    worker that made the change sees it; ttl then bounds how long the
+    others keep quoting the old prices.
+    """
+
+    GENERATION_KEY = 'pricing:generation'
+
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, turf_id):
+        return f'pricing:{self.backend.counter(self.GENERATION_KEY)}:{turf_id}'
+
+    def peek(self, turf_id):
+        """Cached grid or None, without touching SQLite."""
+        grid = self.backend.get(self._key(turf_id))
+        if grid is not None:
+            with self._lock:
+                self.hits += 1
+        return grid
+
+    def get(self, turf_id, get_conn):
+        grid = self.peek(turf_id)
+        if grid is not None:
+            return grid
+        with self._lock:
+            self.misses += 1
+        key = self._key(turf_id)
+        grid, uses_demand = build_grid(get_conn(), turf_id)
+        if grid is not None:
+            ttl = min(DEMAND_TTL, self.ttl or DEMAND_TTL) if uses_demand else self.ttl
+            self.backend.set(key, grid, ttl)
+        return grid
+
+    def invalidate(self):
+        return self.backend.incr(self.GENERATION_KEY)
+
+    def stats(self):
+        with self._lock:
+            return {'generation': self.backend.counter(self.GENERATION_KEY),
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    # Shares the catalog's backend, so with CACHE_URL every worker sees one set of grids
+    # and invalidate() reaches all of them; without it, grids expire after PRICING_TTL
+    ttl = None if app.config.get('CACHE_URL') else app.config.get('PRICING_TTL', LOCAL_TTL)
+    app.extensions['pricing'] = PriceGrids(app.extensions['catalog'].backend, ttl)
+
+
+def get_grids():
+    return current_app.extensions['pricing']
@@ -0,0 +1,134 @@
+import db
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# turfs.rating_sum / rating_count are running totals over the reviews table,
+# adjusted by delta in these triggers instead of re-running AVG() per review.
+# rating / review_count are what the templates show; they switch over to the
+# real figures once a turf has reviews, as the old AVG() code did.
+SCHEMA = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_reviews_user_turf ON reviews(user_id, turf_id);
+    CREATE INDEX IF NOT EXISTS idx_bookings_user_turf ON bookings(user_id, turf_id);
+
+    CREATE TRIGGER IF NOT EXISTS reviews_rating_ai AFTER INSERT ON reviews BEGIN
+        UPDATE turfs SET
+            rating_sum=rating_sum+new.rating,
+            rating_count=rating_count+1,
+            rating=round((rating_sum+new.rating)*1.0/(rating_count+1), 1),
+            review_count=rating_count+1
+        WHERE id=new.turf_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_rating_au AFTER UPDATE OF rating ON reviews
+    WHEN old.rating != new.rating BEGIN
+        UPDATE turfs SET
+            rating_sum=rating_sum+new.rating-old.rating,
+            rating=round((rating_sum+new.rating-old.rating)*1.0/rating_count, 1)
+        WHERE id=new.turf_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_rating_ad AFTER DELETE ON reviews BEGIN
+        UPDATE turfs SET
+            rating_sum=rating_sum-old.rating,
+            rating_count=rating_count-1,
+            rating=CASE WHEN rating_count>1 THEN round((rating_sum-old.rating)*1.0/(rating_count-1), 1) ELSE rating END,
+            review_count=rating_count-1
+        WHERE id=old.turf_id;
+    END;
+'''
+
+# Per-turf star histogram for the detail page, maintained the same way.
+# idx_reviews_turf_created serves the newest-first keyset pages of reviews.
+HISTOGRAM_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS turf_rating_histogram (
+        turf_id INTEGER NOT NULL,
+        stars INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (turf_id, stars)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_reviews_turf_created ON reviews(turf_id, created_at, id);
+
+    CREATE TRIGGER IF NOT EXISTS reviews_hist_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO turf_rating_histogram (turf_id, stars, count) VALUES (new.turf_id, new.rating, 1)
+        ON CONFLICT(turf_id, stars) DO UPDATE SET count=count+1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_hist_au AFTER UPDATE OF rating ON reviews
+    WHEN old.rating != new.rating BEGIN
+        UPDATE turf_rating_histogram SET count=count-1 WHERE turf_id=old.turf_id AND stars=old.rating;
+        INSERT INTO turf_rating_histogram (turf_id, stars, count) VALUES (new.turf_id, new.rating, 1)
+        ON CONFLICT(turf_id, stars) DO UPDATE SET count=count+1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_hist_ad AFTER DELETE ON reviews BEGIN
+        UPDATE turf_rating_histogram SET count=count-1 WHERE turf_id=old.turf_id AND stars=old.rating;
+    END;
+'''
+
+REVIEWS_PAGE = 5
+REVIEW_SELECT = """
+    SELECT r.id, r.rating, r.comment, r.created_at, u.name AS user_name
+    FROM reviews r JOIN users u ON r.user_id=u.id
+"""
+REVIEW_KEYS = [('r.created_at', 'created_at'), ('r.id', 'id')]
+
+UPSERT_SQL = """
+    INSERT INTO reviews (user_id, turf_id, rating, comment) VALUES (?,?,?,?)
+    ON CONFLICT(user_id, turf_id) DO UPDATE SET rating=excluded.rating, comment=excluded.comment
+"""
+
+
+def init_schema(conn):
+    fresh = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='reviews_rating_ai'").fetchone()
+    db.add_column(conn, 'turfs', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0')
+    db.add_column(conn, 'turfs', 'rating_count', 'INTEGER NOT NULL DEFAULT 0')
+    if fresh:
+        # The old read-then-write path could store two reviews per user/turf; keep the latest
+        conn.execute("DELETE FROM reviews WHERE id NOT IN (SELECT MAX(id) FROM reviews GROUP BY user_id, turf_id)")
+    conn.executescript(SCHEMA)
+    if fresh:
+        reconcile(conn, fix=True)
+    fresh_histogram = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='turf_rating_histogram'").fetchone()
+    conn.executescript(HISTOGRAM_SCHEMA)
+    if fresh_histogram:
+        rebuild_histogram(conn)
+
+
+def rebuild_histogram(conn):
+    conn.execute("DELETE FROM turf_rating_histogram")
+    conn.execute("""
+        INSERT INTO turf_rating_histogram (turf_id, stars, count)
+        SELECT turf_id, rating, COUNT(*) FROM reviews GROUP BY turf_id, rating
+    """)
+
+
+def histogram(conn, turf_id):
+    """{stars: count} for 5..1, zero-filled."""
+    counts = dict(conn.execute("SELECT stars, count FROM turf_rating_histogram WHERE turf_id=?", (turf_id,)).fetchall())
+    return {stars: counts.get(stars, 0) for stars in range(5, 0, -1)}
+
+
+def reconcile(conn, fix=False):
+    """Compare running totals with the reviews table.
+
+    Returns [(turf_id, stored_sum, stored_count, actual_sum, actual_count)] for
+    every turf that disagrees; with fix=True those turfs are corrected and the
+    star histograms are rebuilt.
+    """
+    drift = [tuple(row) for row in conn.execute("""
+        SELECT t.id, t.rating_sum, t.rating_count, COALESCE(r.total, 0), COALESCE(r.n, 0)
+        FROM turfs t LEFT JOIN (
+            SELECT turf_id, SUM(rating) AS total, COUNT(*) AS n FROM reviews GROUP BY turf_id
+        ) r ON r.turf_id=t.id
+        WHERE t.rating_sum != COALESCE(r.total, 0) OR t.rating_count != COALESCE(r.n, 0)
+    """)]
+    if fix:
+        conn.executemany("""
+            UPDATE turfs SET rating_sum=?, rating_count=?,
+                rating=CASE WHEN ?>0 THEN round(?*1.0/?, 1) ELSE rating END,
+                review_count=CASE WHEN ?>0 THEN ? ELSE review_count END
+            WHERE id=?
+        """, [(s, n, n, s, n or 1, n, n, turf_id) for turf_id, _, _, s, n in drift])
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name='turf_rating_histogram'").fetchone():
+            rebuild_histogram(conn)
+    return drift
@@ -5,4 +5,5 @@ echo "=================================="
 echo ""
 echo "Starting server..."
 cd "$(dirname "$0")"
-python3 app.py
+# Multi-worker production server; `python3 app.py` is the single-process dev server
+python3 serve.py "$@"
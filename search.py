@@ -0,0 +1,130 @@
+import re
+
+import geo
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# turfs_fts is an external-content FTS5 index over turfs; the triggers keep it
+# in step with every INSERT/UPDATE/DELETE on turfs. turf_sports is the
+# normalized form of the comma-joined turfs.sports column.
+SCHEMA = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS turfs_fts USING fts5(
+        name, location, city, description,
+        content='turfs', content_rowid='id'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS turfs_fts_ai AFTER INSERT ON turfs BEGIN
+        INSERT INTO turfs_fts(rowid, name, location, city, description)
+        VALUES (new.id, new.name, new.location, new.city, new.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS turfs_fts_ad AFTER DELETE ON turfs BEGIN
+        INSERT INTO turfs_fts(turfs_fts, rowid, name, location, city, description)
+        VALUES ('delete', old.id, old.name, old.location, old.city, old.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS turfs_fts_au AFTER UPDATE OF name, location, city, description ON turfs BEGIN
+        INSERT INTO turfs_fts(turfs_fts, rowid, name, location, city, description)
+        VALUES ('delete', old.id, old.name, old.location, old.city, old.description);
+        INSERT INTO turfs_fts(rowid, name, location, city, description)
+        VALUES (new.id, new.name, new.location, new.city, new.description);
+    END;
+
+    CREATE TABLE IF NOT EXISTS turf_sports (
+        sport TEXT NOT NULL COLLATE NOCASE,
+        turf_id INTEGER NOT NULL,
+        PRIMARY KEY (sport, turf_id),
+        FOREIGN KEY(turf_id) REFERENCES turfs(id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_turf_sports_turf ON turf_sports(turf_id);
+    CREATE INDEX IF NOT EXISTS idx_turfs_active_rating ON turfs(is_active, rating DESC);
+    CREATE INDEX IF NOT EXISTS idx_turfs_active_price ON turfs(is_active, price_per_hour);
+    CREATE INDEX IF NOT EXISTS idx_turfs_active_distance ON turfs(is_active, distance);
+'''
+
+SORT_MAP = {
+    'rating': 'rating DESC, id',
+    'price_asc': 'price_per_hour ASC, id',
+    'price_desc': 'price_per_hour DESC, id',
+    'distance': 'distance ASC, id',
+}
+
+PER_PAGE = 12
+
+
+def init_schema(conn):
+    fresh = not conn.execute("SELECT 1 FROM sqlite_master WHERE name='turfs_fts'").fetchone()
+    conn.executescript(SCHEMA)
+    if fresh:
+        # Backfill indexes for turfs that existed before the search tables
+        conn.execute("INSERT INTO turfs_fts(turfs_fts) VALUES ('rebuild')")
+        for row in conn.execute("SELECT id, sports FROM turfs").fetchall():
+            sync_sports(conn, row[0], row[1])
+
+
+def split_sports(sports):
+    return sorted({s.strip() for s in (sports or '').split(',') if s.strip()}, key=str.lower)
+
+
+def sync_sports(conn, turf_id, sports):
+    conn.execute("DELETE FROM turf_sports WHERE turf_id=?", (turf_id,))
+    conn.executemany("INSERT OR IGNORE INTO turf_sports (sport, turf_id) VALUES (?,?)",
+                     [(s, turf_id) for s in split_sports(sports)])
+
+
+def fts_query(text, columns=None):
+    """Turn free user input into a safe FTS5 prefix query ('kora blr' -> "kora"* "blr"*)."""
+    terms = re.findall(r'\w+', text, re.UNICODE)
+    if not terms:
+        return None
+    query = ' '.join(f'"{t}"*' for t in terms)
+    if columns:
+        query = '{%s} : (%s)' % (' '.join(columns), query)
+    return query
+
+
+def search_turfs(conn, location='', sport='', min_price=0, max_price=None, sort='rating',
+                 q='', near=None, page=1, per_page=PER_PAGE):
+    """Filtered, sorted page of active turfs. Returns (rows, total).
+
+    near=(lat, lon, radius_km) restricts results to that circle via the R*Tree
+    and replaces each row's distance with the real distance from the user.
+    """
+    where = ["is_active=1"]
+    params = []
+    for text, columns in ((location, ('location', 'city')), (q, None)):
+        match = fts_query(text, columns) if text else None
+        if match:
+            where.append("id IN (SELECT rowid FROM turfs_fts WHERE turfs_fts MATCH ?)")
+            params.append(match)
+    if sport:
+        where.append("id IN (SELECT turf_id FROM turf_sports WHERE sport=?)")
+        params.append(sport.strip())
+    if min_price:
+        where.append("price_per_hour >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("price_per_hour <= ?")
+        params.append(max_price)
+
+    if near:
+        lat, lon, radius_km = near
+        where.append(geo.BOX_SQL)
+        params.extend(geo.bounding_box(lat, lon, radius_km))
+
+    clause = ' AND '.join(where)
+    order = SORT_MAP.get(sort, SORT_MAP['rating'])
+    if near:
+        # The box bounds the candidate set, so finishing in Python is cheap
+        rows = geo.within(conn.execute(f"SELECT * FROM turfs WHERE {clause} ORDER BY {order}", params),
+                          lat, lon, radius_km)
+        if sort == 'distance':
+            rows.sort(key=lambda t: t['distance'])
+        start = (page - 1) * per_page
+        return rows[start:start + per_page], len(rows)
+
+    total = conn.execute(f"SELECT COUNT(*) FROM turfs WHERE {clause}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM turfs WHERE {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+        params + [per_page, (page - 1) * per_page]).fetchall()
+    return rows, total
@@ -0,0 +1,97 @@
+"""Production launcher: python serve.py --workers 4 --threads 8
+
+Initialises the database and builds the static assets once in the parent process,
+then hands the app to a multi-worker server. Each worker builds its own app (and
+so its own connection pool and caches) after the fork.
+"""
+import importlib.util
+import os
+import sys
+
+import click
+
+import assets
+from app import create_app, init_db
+
+SERVERS = ['gunicorn', 'uvicorn', 'waitress', 'werkzeug']
+
+
+def available(server):
+    return server == 'werkzeug' or importlib.util.find_spec(server) is not None
+
+
+def pick_server():
+    # gunicorn is POSIX only; waitress is the usual choice on Windows
+    for server in (['gunicorn', 'uvicorn'] if os.name == 'posix' else []) + ['waitress']:
+        if available(server):
+            return server
+    return 'werkzeug'
+
+
+def run_gunicorn(host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class TurfBookApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread' if threads > 1 else 'sync')
+
+        def load(self):
+            # Called in each worker after the fork: no sqlite handles cross processes
+            return create_app()
+
+    TurfBookApplication().run()
+
+
+def run_uvicorn(host, port, workers, threads):
+    import uvicorn
+    # Sync views run on asgiref's executor, which reads ASGI_THREADS
+    os.environ.setdefault('ASGI_THREADS', str(threads))
+    uvicorn.run('asgi:application', host=host, port=port, workers=workers)
+
+
+def run_waitress(host, port, workers, threads):
+    from waitress import serve
+    if workers > 1:
+        click.echo('waitress is single-process; ignoring --workers, use --threads to scale.', err=True)
+    serve(create_app(), host=host, port=port, threads=threads)
+
+
+def run_werkzeug(host, port, workers, threads):
+    from werkzeug.serving import run_simple
+    click.echo('No production server installed (pip install gunicorn or waitress); '
+               'falling back to the Werkzeug server.', err=True)
+    # Werkzeug's processes= forks per request, so every child would start with an
+    # empty pool and caches and never run the job queue; stay in one threaded process
+    if workers > 1:
+        click.echo('The Werkzeug server runs a single process; ignoring --workers.', err=True)
+    run_simple(host, port, create_app(), threaded=True, processes=1)
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=5000, show_default=True)
+@click.option('--workers', type=int, default=lambda: min(os.cpu_count() or 1, 8) * 2 + 1, show_default='2 x CPUs + 1')
+@click.option('--threads', default=4, show_default=True, help='Threads per worker.')
+@click.option('--server', type=click.Choice(['auto'] + SERVERS), default='auto', show_default=True)
+@click.option('--skip-init', is_flag=True, help='Do not create/migrate the schema or build static assets first.')
+def main(host, port, workers, threads, server, skip_init):
+    """Serve TurfBook with a multi-worker WSGI/ASGI server."""
+    if server == 'auto':
+        server = pick_server()
+    elif not available(server):
+        raise click.ClickException(f'{server} is not installed.')
+    if not skip_init:
+        init_db()
+        assets.build(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    # Read by create_app in every worker to size the admission gate
+    os.environ['TURFBOOK_THREADS'] = str(threads)
+    click.echo(f'Serving on http://{host}:{port} with {server}: {workers} worker(s) x {threads} thread(s)')
+    {'gunicorn': run_gunicorn, 'uvicorn': run_uvicorn,
+     'waitress': run_waitress, 'werkzeug': run_werkzeug}[server](host, port, workers, threads)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
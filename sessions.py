@@ -0,0 +1,297 @@
+import hashlib
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+from db import add_column, immediate
+
+# ─── SCHEMA ───────────────────────────────────────────────────
+# Session data lives server-side; the cookie carries only a random id.
+# Rows are keyed by a SHA-256 of that id, so reading the table does not
+# hand out usable cookies. version goes up on every change to data, so a
+# worker can tell whether the row is still the one it read.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at);
+'''
+
+SID_RE = re.compile(r'[A-Za-z0-9_-]{43}')   # secrets.token_urlsafe(32)
+CACHE_SECONDS = 5         # how long a cached session is trusted before re-reading SQLite
+
+
+def init_schema(conn):
+    conn.executescript(SCHEMA)
+    add_column(conn, 'sessions', 'version', 'INTEGER NOT NULL DEFAULT 1')
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+def _key(sid):
+    return hashlib.sha256(sid.encode()).hexdigest()
+
+
+def expire_sessions(conn):
+    """Delete sessions past their expiry (and drop them from this process's cache)."""
+    if has_app_context() and 'sessions' in current_app.extensions:
+        current_app.extensions['sessions'].purge()
+    with immediate(conn):
+        return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+# ─── STORE ────────────────────────────────────────────────────
+
+class SessionStore:
+    """SQLite sessions behind an in-process LRU.
+
+    A cached entry is served without touching SQLite for CACHE_SECONDS, so
+    login_required and admin_required cost a dict lookup. Another worker's
+    change (a logout, a pending booking) can therefore go unseen here for
+    that long, but it is never overwritten: save() and touch() only apply
+    if the row is still at the version this worker read, and report a
+    conflict otherwise (see SqliteSessionInterface for what happens next).
+    Entries hold the serialized payload, which lets save() skip writes when
+    nothing changed.
+    """
+
+    def __init__(self, pool, max_entries=10000, cache_seconds=CACHE_SECONDS):
+        self.pool = pool
+        self.max_entries = max_entries
+        self.cache_seconds = cache_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.conflicts = 0
+
+    def load(self, sid, fresh=False):
+        """(payload, expires_at, version) for a live session, else None. fresh skips the cache."""
+        key, now = _key(sid), time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not fresh and entry is not None and entry[1] > now and entry[3] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[:3]
+            self.misses += 1
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute("SELECT data, expires_at, version FROM sessions WHERE id=? AND expires_at > ?",
+                               (key, now)).fetchone()
+        finally:
+            self.pool.release(conn)
+        if row is None:
+            self._forget(key)
+            return None
+        self._store(key, row['data'], row['expires_at'], row['version'])
+        return row['data'], row['expires_at'], row['version']
+
+    def save(self, sid, payload, expires_at, version=None):
+        """Write a session; version is what load() returned, None for a new id.
+
+        Returns False, writing nothing, if the row changed (or went away)
+        since that version was read.
+        """
+        key = _key(sid)
+        if version is None:
+            new_version = self._write("INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?) RETURNING version",
+                                      (key, payload, expires_at))
+        else:
+            new_version = self._write("""
+                UPDATE sessions SET data=?, expires_at=?, version=version + 1
+                WHERE id=? AND version=? RETURNING version
+            """, (payload, expires_at, key, version))
+        return self._settle(key, payload, expires_at, new_version)
+
+    def touch(self, sid, payload, expires_at, version):
+        """Push an unchanged session's expiry forward."""
+        key = _key(sid)
+        found = self._write("UPDATE sessions SET expires_at=? WHERE id=? AND version=? RETURNING version",
+                            (expires_at, key, version))
+        return self._settle(key, payload, expires_at, found)
+
+    def _settle(self, key, payload, expires_at, version):
+        if version is None:
+            with self._lock:
+                self.conflicts += 1
+            self._forget(key)
+            return False
+        self._store(key, payload, expires_at, version)
+        return True
+
+    def delete(self, sid):
+        key = _key(sid)
+        self._write("DELETE FROM sessions WHERE id=?", (key,))
+        self._forget(key)
+
+    def purge(self):
+        """Drop expired entries from the cache."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[1] <= now]:
+                del self._entries[key]
+
+    def _write(self, sql, params):
+        """Run one statement and commit; returns the first column of a RETURNING row."""
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute(sql, params).fetchone()
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        with self._lock:
+            self.writes += 1
+        return row[0] if row else None
+
+    def _store(self, key, payload, expires_at, version):
+        with self._lock:
+            self._entries[key] = (payload, expires_at, version, time.time() + self.cache_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes,
+                    'conflicts': self.conflicts, 'entries': len(self._entries),
+                    'hit_ratio': round(self.hits / total, 4) if total else 0.0}
+
+
+# ─── SESSION INTERFACE ────────────────────────────────────────
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, payload=None, expires_at=0.0, version=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.new = sid is None
+        self.sid = sid or new_sid()
+        self.payload = payload
+        self.expires_at = expires_at
+        self.version = version
+        self.modified = False
+        self.rotated = None
+
+    def regenerate(self):
+        """Move the data to a fresh id; call on login so a planted id is useless."""
+        if not self.new and self.rotated is None:
+            self.rotated = self.sid
+        self.sid = new_sid()
+        self.modified = True
+
+
+def merge(base, ours, theirs):
+    """Apply the keys a request changed between base and ours on top of theirs."""
+    merged = dict(theirs)
+    for name in set(base) | set(ours):
+        if name not in ours:
+            merged.pop(name, None)
+        elif name not in base or base[name] != ours[name]:
+            merged[name] = ours[name]
+    return merged
+
+
+class SqliteSessionInterface(SessionInterface):
+    """Flask session interface over SessionStore.
+
+    Sessions expire after PERMANENT_SESSION_LIFETIME without use; the expiry
+    is pushed forward once less than half of it remains, so an active user
+    costs a write only now and then. Empty sessions are never stored.
+
+    When another worker wrote the session since this request read it, the
+    keys this request changed are replayed onto the current row, so two
+    requests touching different keys (one storing a pending booking, one
+    popping a flash) both land. A session ended elsewhere stays ended.
+    """
+
+    MERGE_ATTEMPTS = 3
+
+    serializer = session_json_serializer
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and SID_RE.fullmatch(sid):
+            found = self.store.load(sid)
+            if found is not None:
+                payload, expires_at, version = found
+                return ServerSession(self.serializer.loads(payload), sid, payload, expires_at, version)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        if not session.new:
+            response.vary.add('Cookie')
+        if session.rotated:
+            self.store.delete(session.rotated)
+
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        payload = self.serializer.dumps(dict(session))
+        if session.new or session.rotated:
+            written = self.store.save(session.sid, payload, now + ttl)
+        elif payload != session.payload:
+            written = self._save_merged(session, payload, now + ttl)
+        elif session.expires_at - now < ttl / 2:
+            # Losing here means another worker just wrote, which pushed the expiry too
+            written = self.store.touch(session.sid, payload, now + ttl, session.version)
+        else:
+            return
+        if not written:
+            return
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+    def _save_merged(self, session, payload, expires_at):
+        base, ours = self.serializer.loads(session.payload), dict(session)
+        version = session.version
+        for _ in range(self.MERGE_ATTEMPTS):
+            if self.store.save(session.sid, payload, expires_at, version):
+                return True
+            current = self.store.load(session.sid, fresh=True)
+            if current is None:
+                return False
+            theirs, _, version = current
+            payload = self.serializer.dumps(merge(base, ours, self.serializer.loads(theirs)))
+        return False
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    store = SessionStore(app.extensions['db_pool'], max_entries=app.config.get('SESSION_CACHE_SIZE', 10000),
+                         cache_seconds=app.config.get('SESSION_CACHE_SECONDS', CACHE_SECONDS))
+    app.extensions['sessions'] = store
+    app.session_interface = SqliteSessionInterface(store)
+
+
+def get_store():
+    return current_app.extensions['sessions']
@@ -0,0 +1,128 @@
+import logging
+from functools import lru_cache
+from flask import current_app
+
+import availability
+from booking import parse_time, format_time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOURS = ('6 AM', '11 PM')   # turfs.open_time / close_time column defaults
+DAY = 24 * 60
+
+
+# ─── OPERATING HOURS ──────────────────────────────────────────
+
+def parse_clock(value):
+    """'5 AM', '5:30 pm', '12 AM' or '17:00' -> minutes since midnight."""
+    text = value.strip().upper().replace('.', '')
+    suffix = text[-2:] if text[-2:] in ('AM', 'PM') else None
+    if suffix:
+        text = text[:-2].strip()
+    hours, _, minutes = text.partition(':')
+    hours, minutes = int(hours), int(minutes or 0)
+    if suffix:
+        if not 1 <= hours <= 12:
+            raise ValueError(f'Invalid time: {value}')
+        hours = hours % 12 + (12 if suffix == 'PM' else 0)
+    total = hours * 60 + minutes
+    if not 0 <= minutes < 60 or not 0 <= total <= DAY:
+        raise ValueError(f'Invalid time: {value}')
+    return total
+
+
+def operating_ranges(open_time, close_time):
+    """[start, end) minute ranges a turf is open within one calendar day.
+
+    A close at or before the open runs past midnight: '6 PM'-'2 AM' is
+    [(0, 120), (1080, 1440)], the early hours being the tail of the previous
+    evening. Equal open and close means open around the clock.
+    """
+    start, end = parse_clock(open_time), parse_clock(close_time) % DAY
+    if start % DAY == end:
+        return [(0, DAY)]
+    if start < end:
+        return [(start, end)]
+    return ([(0, end)] if end else []) + [(start, DAY)]
+
+
+@lru_cache(maxsize=256)
+def compile_grid(open_time, close_time, minutes):
+    """Slots of `minutes` from each opening, as plain data so it can be cached anywhere.
+
+    Turfs share a handful of distinct hours, so each pair is parsed once per
+    process. The result is shared; callers must not modify it.
+    """
+    try:
+        ranges = operating_ranges(open_time, close_time)
+    except ValueError:
+        log.warning('Unparseable opening hours %r-%r, using %s-%s', open_time, close_time, *DEFAULT_HOURS)
+        ranges = operating_ranges(*DEFAULT_HOURS)
+    slots = [[format_time(s), format_time(s + minutes), availability.minute_mask(s, s + minutes)]
+             for start, end in ranges for s in range(start, end - minutes + 1, minutes)]
+    return {
+        'minutes': minutes,
+        'ranges': [list(r) for r in ranges],
+        'slots': slots,
+        'starts': [s[0] for s in slots],
+        'ends': [s[1] for s in slots],
+    }
+
+
+def allows(grid, start_time, end_time):
+    """True if [start, end) lies inside one opening and on its slot boundaries."""
+    start, end = parse_time(start_time), parse_time(end_time)
+    minutes = grid['minutes']
+    return any(a <= start < end <= b and (start - a) % minutes == 0 and (end - a) % minutes == 0
+               for a, b in grid['ranges'])
+
+
+def slot_states(grid, bitmap, held=0):
+    """The grid's slots for one day, each marked free or not from the booked and held bitmaps.
+
+    held is set on slots nobody has booked but someone else is holding.
+    """
+    return [{'start': start, 'end': end, 'free': not (bitmap | held) & mask,
+             'held': bool(held & mask) and not bitmap & mask} for start, end, mask in grid['slots']]
+
+
+def describe(grid):
+    """'06:00-23:00' or '00:00-02:00, 18:00-24:00' for messages."""
+    return ', '.join(f'{format_time(a)}-{format_time(b)}' for a, b in grid['ranges'])
+
+
+# ─── PER-TURF GRIDS ───────────────────────────────────────────
+
+class SlotGrids:
+    """Per-turf grids kept in the catalog cache.
+
+    Editing a turf bumps the catalog generation, so a changed open or close
+    time is picked up on the next read without any extra invalidation.
+    """
+
+    def __init__(self, catalog, minutes=60):
+        if minutes % availability.SLOT_MINUTES or not 0 < minutes <= DAY:
+            raise ValueError(f'SLOT_MINUTES must be a multiple of {availability.SLOT_MINUTES}')
+        self.catalog = catalog
+        self.minutes = minutes
+
+    def for_turf(self, turf):
+        """Grid for a turf row the caller already has."""
+        return compile_grid(turf['open_time'] or DEFAULT_HOURS[0], turf['close_time'] or DEFAULT_HOURS[1],
+                            self.minutes)
+
+    def get(self, turf_id, get_conn):
+        def load():
+            turf = get_conn().execute("SELECT open_time, close_time FROM turfs WHERE id=?", (turf_id,)).fetchone()
+            return self.for_turf(turf) if turf else None
+        return self.catalog.get_or_load(f'slots:{turf_id}', load)
+
+
+# ─── FLASK INTEGRATION ───────────────────────────────────────
+
+def init_app(app):
+    app.extensions['slots'] = SlotGrids(app.extensions['catalog'], app.config.get('SLOT_MINUTES', 60))
+
+
+def get_grids():
+    return current_app.extensions['slots']
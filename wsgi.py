@@ -0,0 +1,8 @@
+"""WSGI entry point: gunicorn -w 4 --threads 8 wsgi:application
+
+Run `flask --app app init-db` (or serve.py, which does it for you) once
+before starting workers; creating the app never migrates the schema.
+"""
+from app import create_app
+
+application = create_app()